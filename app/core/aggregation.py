@@ -0,0 +1,107 @@
+import pandas as pd
+from typing import Any
+from core.config import modify_query
+
+WIB_TIME_ZONE = "+07:00"
+DAY_KEY_FORMAT = "yyyyMMdd"
+GROUP_FIELD = "type"
+
+
+def build_metric_aggregations(base_fields: dict[str, str], selected_types: str):
+    metrics = {
+        "max_tps": {"max": {"field": base_fields["max"]}},
+        "avg_tps": {"avg": {"field": base_fields["avg"]}},
+        "total_transaction_per_day": {"sum": {"field": base_fields["total"]}},
+        "max_percentile_95": {
+            "percentiles": {"field": base_fields["max"], "percents": [95]}
+        },
+    }
+
+    if selected_types == "BNI Direct":
+        metrics["nominal_transaction_per_day"] = {
+            "sum": {"field": base_fields["total_debit"]}
+        }
+
+    return metrics
+
+
+def build_aggregation_query(
+    base_query: dict[str, Any],
+    start_time: str,
+    end_time: str,
+    base_fields: dict[str, str],
+    selected_types: str,
+):
+    query = modify_query(base_query, 0, start_time, end_time)
+    query.pop("sort", None)
+    query.pop("_source", None)
+
+    metrics = build_metric_aggregations(base_fields, selected_types)
+    per_day = {
+        "date_histogram": {
+            "field": "@timestamp",
+            "calendar_interval": "day",
+            "time_zone": WIB_TIME_ZONE,
+            "format": DAY_KEY_FORMAT,
+            "min_doc_count": 1,
+        }
+    }
+
+    # WONDR is reported per day and per type, so split every day by type
+    if selected_types in ["WONDR"]:
+        per_day["aggs"] = {
+            "per_type": {
+                "terms": {"field": GROUP_FIELD, "size": 100},
+                "aggs": metrics,
+            }
+        }
+    else:
+        per_day["aggs"] = metrics
+
+    query["aggs"] = {"per_day": per_day}
+    return query
+
+
+def restore_integer(series: pd.Series):
+    # Elasticsearch returns max/sum as floats, pandas keeps integer columns as int64
+    values = series.dropna()
+    if len(values) == len(series) and (values % 1 == 0).all():
+        return series.astype("int64")
+    return series
+
+
+def parse_day_buckets(response: dict[str, Any], selected_types: str):
+    rows = []
+    for day_bucket in response["aggregations"]["per_day"]["buckets"]:
+        if selected_types in ["WONDR"]:
+            metric_buckets = [
+                (bucket["key"], bucket) for bucket in day_bucket["per_type"]["buckets"]
+            ]
+        else:
+            metric_buckets = [(None, day_bucket)]
+
+        for group_key, bucket in metric_buckets:
+            row = {"TRX_DATE": day_bucket["key_as_string"]}
+            if group_key is not None:
+                row["type"] = group_key
+            for name, value in bucket.items():
+                if name == "max_percentile_95":
+                    row[name] = next(iter(value["values"].values()))
+                elif isinstance(value, dict) and "value" in value:
+                    row[name] = value["value"]
+            rows.append(row)
+
+    if not rows:
+        return pd.DataFrame()
+
+    day_group = ["TRX_DATE", "type"] if selected_types in ["WONDR"] else ["TRX_DATE"]
+    tps_per_day = pd.DataFrame(rows)
+    tps_per_day["TRX_DATE"] = pd.to_datetime(tps_per_day["TRX_DATE"], format="%Y%m%d")
+    metric_columns = sorted(column for column in tps_per_day if column not in day_group)
+    tps_per_day = tps_per_day[day_group + metric_columns]
+
+    for column in ["max_tps", "total_transaction_per_day", "nominal_transaction_per_day"]:
+        if column in tps_per_day:
+            tps_per_day[column] = restore_integer(tps_per_day[column])
+
+    return tps_per_day.sort_values(by=day_group).reset_index(drop=True)
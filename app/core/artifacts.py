@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import pandas as pd
+from io import BytesIO
+from typing import Any
+from core.config import get_config, resolve_path
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that decide how each format looks, any edit to them changes the key
+TEMPLATE_MODULES = {
+    "pdf": ["pdf.py", "presentation.py"],
+    "xlsx": ["excel.py", "presentation.py"],
+}
+
+
+def module_digest(module_names: list[str]):
+    digest = hashlib.sha256()
+    for module_name in module_names:
+        with open(os.path.join(CORE_DIR, module_name), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+TEMPLATE_VERSIONS = {
+    report_format: module_digest(module_names)
+    for report_format, module_names in TEMPLATE_MODULES.items()
+}
+
+
+def render_settings(report_format: str):
+    """Everything besides the data that decides the bytes of a rendered report."""
+    settings = {
+        "template": TEMPLATE_VERSIONS[report_format],
+        # How the per-day values, the 95th percentile above all, are computed
+        "fetch_mode": get_config("fetch", "mode", "raw"),
+        "aggregation_backend": get_config("fetch", "aggregation_backend", "pandas"),
+        "sketch_accuracy": get_config("fetch", "sketch_accuracy", 0.01),
+    }
+    if report_format == "pdf":
+        settings["table_renderer"] = get_config("pdf", "table_renderer", "native")
+        settings["chart_ppi"] = get_config("pdf", "chart_ppi", 200)
+    return settings
+
+
+def artifacts_dir():
+    return resolve_path(get_config("artifacts", "dir", "artifacts"))
+
+
+def clear_artifacts():
+    shutil.rmtree(artifacts_dir(), ignore_errors=True)
+
+
+def pregenerated_path(file_name: str):
+    return os.path.join(artifacts_dir(), "pregenerated", file_name)
+
+
+def pregenerated_settings(file_name: str):
+    return render_settings(os.path.splitext(file_name)[1][1:])
+
+
+def is_pregenerated_current(file_name: str):
+    """True when the pre-generated file was rendered with today's render settings."""
+    try:
+        with open(f"{pregenerated_path(file_name)}.json", "r") as file:
+            return json.load(file) == pregenerated_settings(file_name)
+    except (OSError, ValueError):
+        return False
+
+
+def load_pregenerated(file_name: str):
+    """Return a report written by the pre-generation job, None if there is none.
+
+    Files rendered by another template version or other render settings are
+    ignored, the report is then rendered again.
+    """
+    path = pregenerated_path(file_name)
+    if not os.path.isfile(path) or not is_pregenerated_current(file_name):
+        return None
+    try:
+        with open(path, "rb") as file:
+            return BytesIO(file.read())
+    except Exception as e:
+        print(f"Failed to read pre-generated report {path}: {e}")
+        return None
+
+
+def store_pregenerated(file_name: str, buffer: BytesIO):
+    path = pregenerated_path(file_name)
+    write_atomic(path, buffer.getvalue())
+    write_atomic(
+        f"{path}.json", json.dumps(pregenerated_settings(file_name)).encode()
+    )
+
+
+def write_atomic(path: str, content: bytes):
+    """Write next to the target and rename, readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    try:
+        with open(temp_path, "wb") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def data_fingerprint(data: Any):
+    """Hash every frame of the report data, including column names and index."""
+    digest = hashlib.sha256()
+    if isinstance(data, pd.DataFrame):
+        digest.update(json.dumps([str(column) for column in data.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    elif isinstance(data, dict):
+        for name in sorted(data):
+            digest.update(name.encode())
+            digest.update(data_fingerprint(data[name]).encode())
+    return digest.hexdigest()
+
+
+def artifact_key(
+    selected_type: str,
+    times: dict[str, str],
+    report_format: str,
+    data: dict[str, Any],
+):
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "type": selected_type,
+                "times": times,
+                "format": report_format,
+                "data": data_fingerprint(data),
+                **render_settings(report_format),
+                # The PDF title prints the day it was generated
+                "date": time.strftime("%d/%m/%Y") if report_format == "pdf" else None,
+            },
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()
+
+
+def artifact_path(key: str, report_format: str):
+    return os.path.join(artifacts_dir(), "reports", key[:2], f"{key}.{report_format}")
+
+
+def load_artifact(key: str, report_format: str):
+    path = artifact_path(key, report_format)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "rb") as file:
+            buffer = BytesIO(file.read())
+        # Touch the file so eviction drops the least recently used reports first
+        os.utime(path)
+        return buffer
+    except Exception as e:
+        print(f"Failed to read report artifact {path}: {e}")
+        return None
+
+
+def store_artifact(key: str, report_format: str, buffer: BytesIO):
+    try:
+        write_atomic(artifact_path(key, report_format), buffer.getvalue())
+    except Exception as e:
+        print(f"Failed to write report artifact: {e}")
+        return
+    try:
+        evict_artifacts()
+    except Exception as e:
+        # Another report may be evicting or writing the same files
+        print(f"Failed to evict report artifacts: {e}")
+
+
+def evict_artifacts():
+    """Remove the least recently used reports until the store fits max_size_mb."""
+    max_size = get_config("artifacts", "max_size_mb", 256) * 1024 * 1024
+    root = os.path.join(artifacts_dir(), "reports")
+
+    entries = []
+    for directory, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if ".tmp-" in file_name:
+                continue
+            path = os.path.join(directory, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
@@ -0,0 +1,122 @@
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from typing import Any, Callable
+from core.artifacts import is_pregenerated_current, pregenerated_path
+from core.cache import is_closed_period
+from core.config import get_config
+from core.data import prefetch_report_data
+from core.report import build_report, report_file_name
+from util.enums import Types
+
+
+def batch_file_name(selected_detail: dict[str, Any]):
+    return f"Report-{selected_detail['month']}-{selected_detail['year']}-All-Types.zip"
+
+
+def is_pregenerated(
+    times: dict[str, str], selected_detail: dict[str, Any], report_formats: list[str]
+):
+    """True when build_report will serve every format from the pre-generated files."""
+    file_names = [
+        report_file_name(selected_detail, report_format)
+        for report_format in report_formats
+    ]
+    return is_closed_period(times["end_time"]) and all(
+        os.path.isfile(pregenerated_path(file_name))
+        and is_pregenerated_current(file_name)
+        for file_name in file_names
+    )
+
+
+def build_batch(
+    times: dict[str, str],
+    selected_detail: dict[str, Any],
+    report_formats: list[str],
+    progress: Callable[[int], None] = lambda progress: None,
+):
+    """Render every report type into one ZIP, returns None when no type has data.
+
+    The data of all types is fetched in one pipeline run first (a single msearch
+    in aggregation mode), then the files are rendered concurrently. A report
+    that fails is left out of the ZIP and listed under "failed".
+    """
+    start = time.perf_counter()
+    progress(0)
+
+    details = [{**selected_detail, "type": report_type.value} for report_type in Types]
+    try:
+        prefetch_report_data(
+            times,
+            [
+                detail["type"]
+                for detail in details
+                if not is_pregenerated(times, detail, report_formats)
+            ],
+        )
+    except Exception as e:
+        # Every report retries the fetch of its own type
+        print(f"Prefetch of all types failed: {e}")
+    fetch_time = time.perf_counter() - start
+    progress(40)
+
+    reports = [
+        (detail, report_format)
+        for detail in details
+        for report_format in report_formats
+    ]
+    files = {}
+    failed = {}
+    max_workers = get_config("jobs", "batch_workers", 4)
+    max_workers = max(1, min(max_workers, len(reports)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(build_report, times, detail, report_format): (
+                detail,
+                report_format,
+            )
+            for detail, report_format in reports
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            detail, report_format = futures[future]
+            file_name = report_file_name(detail, report_format)
+            try:
+                buffer = future.result()
+            except Exception as e:
+                print(f"Failed to generate {file_name}: {e}")
+                failed[file_name] = str(e)
+            else:
+                if buffer is not None:
+                    files[file_name] = buffer
+            progress(40 + 60 * done // len(reports))
+
+    if not files:
+        if failed:
+            raise Exception(f"Every report failed: {', '.join(sorted(failed))}")
+        return None
+
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for file_name in sorted(files):
+            archive.writestr(file_name, files[file_name].getvalue())
+    output.seek(0)
+
+    wall_time = time.perf_counter() - start
+    print(
+        f"Generated {len(files)} reports for all types in {wall_time:.2f}s "
+        f"(fetch {fetch_time:.2f}s)"
+    )
+    return {
+        "buffer": output,
+        "files": sorted(files),
+        "empty": sorted(
+            report_file_name(detail, report_format)
+            for detail, report_format in reports
+            if report_file_name(detail, report_format) not in files
+            and report_file_name(detail, report_format) not in failed
+        ),
+        "failed": dict(sorted(failed.items())),
+        "wall_time": wall_time,
+    }
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from core.config import get_config, resolve_path
+
+CACHE_FRAMES = ["data_pdf_day", "data_pdf_month"]
+# Bump when the layout of the stored frames changes
+CACHE_FORMAT_VERSION = 2
+
+
+def cache_dir():
+    return resolve_path(get_config("cache", "dir", "cache"))
+
+
+def is_cache_enabled():
+    return get_config("cache", "enabled", True)
+
+
+def is_incremental_enabled():
+    return is_cache_enabled() and get_config("cache", "incremental", False)
+
+
+def is_closed_period(end_time: str, now: datetime | None = None):
+    """A period is closed once its end is more than closed_grace_minutes in the past.
+
+    Documents are indexed with some lag, so a period only stops changing (and
+    may be cached or pre-generated for good) a while after it ends.
+    """
+    grace = timedelta(minutes=get_config("cache", "closed_grace_minutes", 60))
+    now = now or datetime.now(timezone.utc)
+    return datetime.fromisoformat(end_time) + grace < now
+
+
+def period_cache_key(
+    selected_types: str, start_time: str, end_time: str, query: dict[str, Any]
+):
+    query_hash = hashlib.sha256(
+        json.dumps(
+            {
+                "query": query,
+                "start_time": start_time,
+                "end_time": end_time,
+                "mode": get_config("fetch", "mode", "raw"),
+                # How the 95th percentile is approximated, "aggregation" falls
+                # back to "raw" so both settings are always part of the key
+                "aggregation_backend": get_config(
+                    "fetch", "aggregation_backend", "pandas"
+                ),
+                "sketch_accuracy": get_config("fetch", "sketch_accuracy", 0.01),
+                "version": CACHE_FORMAT_VERSION,
+            },
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()[:16]
+    start = datetime.fromisoformat(start_time)
+    type_dir = selected_types.replace(" ", "_")
+    return os.path.join(cache_dir(), type_dir, f"{start:%Y-%m}-{query_hash}")
+
+
+def partial_cache_key(
+    selected_types: str, start_time: str, end_time: str, query: dict[str, Any]
+):
+    return f"{period_cache_key(selected_types, start_time, end_time, query)}-partial"
+
+
+def load_cached_period(cache_key: str):
+    return read_entry(cache_key, CACHE_FRAMES)
+
+
+def store_cached_period(cache_key: str, data: dict[str, pd.DataFrame]):
+    write_entry(cache_key, {name: data[name] for name in CACHE_FRAMES})
+
+
+def load_partial_period(cache_key: str):
+    """Load the stored days, raw tail rows and cursor of an open month."""
+    partial = read_entry(cache_key, ["days", "tail"])
+    if partial is None:
+        return None
+    try:
+        with open(os.path.join(cache_key, "state.json"), "r") as file:
+            state = json.load(file)
+    except Exception as e:
+        print(f"Failed to read cache state {cache_key}: {e}")
+        return None
+
+    partial["cursor"] = pd.Timestamp(state["cursor"])
+    return partial
+
+
+def store_partial_period(
+    cache_key: str, days: pd.DataFrame, tail: pd.DataFrame, cursor: pd.Timestamp
+):
+    write_entry(
+        cache_key,
+        {"days": days, "tail": tail},
+        state={"cursor": cursor.isoformat()},
+    )
+
+
+def read_entry(cache_key: str, names: list[str]):
+    if not os.path.isdir(cache_key):
+        return None
+    try:
+        data = {
+            name: pd.read_parquet(os.path.join(cache_key, f"{name}.parquet"))
+            for name in names
+        }
+        # Touch the entry so eviction drops the least recently used months first
+        os.utime(cache_key)
+        return data
+    except Exception as e:
+        print(f"Failed to read cache entry {cache_key}: {e}")
+        return None
+
+
+def write_entry(
+    cache_key: str,
+    frames: dict[str, pd.DataFrame],
+    state: dict[str, Any] | None = None,
+):
+    temp_dir = f"{cache_key}.tmp-{uuid.uuid4().hex}"
+    try:
+        os.makedirs(temp_dir)
+        for name, frame in frames.items():
+            frame.to_parquet(os.path.join(temp_dir, f"{name}.parquet"))
+        if state is not None:
+            with open(os.path.join(temp_dir, "state.json"), "w") as file:
+                json.dump(state, file)
+
+    except Exception as e:
+        print(f"Failed to write cache entry {cache_key}: {e}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+
+    replace_entry(temp_dir, cache_key)
+    evict_cache()
+
+
+def replace_entry(temp_dir: str, cache_key: str):
+    """Swap the written directory in, readers never see half an entry.
+
+    The old entry is renamed aside before the new one moves in, so a reader in
+    between only misses the cache. When another writer moved its entry in first
+    (same key, same data) that one is kept.
+    """
+    old_dir = f"{cache_key}.old-{uuid.uuid4().hex}"
+    try:
+        try:
+            os.replace(cache_key, old_dir)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_dir, cache_key)
+    except OSError as e:
+        print(f"Cache entry {cache_key} was written concurrently, keeping it: {e}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def cache_entries():
+    entries = []
+    root = cache_dir()
+    if not os.path.isdir(root):
+        return entries
+
+    for type_dir in os.scandir(root):
+        if not type_dir.is_dir():
+            continue
+        for entry in os.scandir(type_dir.path):
+            if not entry.is_dir() or ".tmp-" in entry.name or ".old-" in entry.name:
+                continue
+            size = sum(file.stat().st_size for file in os.scandir(entry.path))
+            entries.append((entry.stat().st_mtime, size, entry.path))
+    return entries
+
+
+def evict_cache():
+    """Remove the least recently used entries until the cache fits max_size_mb."""
+    max_size = get_config("cache", "max_size_mb", 512) * 1024 * 1024
+    entries = sorted(cache_entries())
+    total_size = sum(size for _, size, _ in entries)
+
+    for _, size, path in entries:
+        if total_size <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
+
+
+def clear_cache():
+    shutil.rmtree(cache_dir(), ignore_errors=True)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from typing import Any
+
+WIB_OFFSET_NS = 7 * 60 * 60 * 10**9
+DAY_NS = 24 * 60 * 60 * 10**9
+
+
+def add_day_columns(df: pd.DataFrame):
+    """Bucket every row into its WIB day and month without formatting strings.
+
+    TRX_DATE is the WIB midnight of the row as a naive datetime64, computed with
+    integer arithmetic on the epoch; only the distinct months are formatted.
+    """
+    df["@timestamp"] = pd.to_datetime(df["@timestamp"], utc=True)
+    epoch_ns = df["@timestamp"].array.asi8
+    day_ns = (epoch_ns + WIB_OFFSET_NS) // DAY_NS * DAY_NS
+    df["TRX_DATE"] = day_ns.view("datetime64[ns]")
+
+    months, month_codes = np.unique(
+        df["TRX_DATE"].to_numpy().astype("datetime64[M]"), return_inverse=True
+    )
+    month_labels = np.array([str(month) for month in months], dtype=object)
+    df["per_month"] = month_labels[month_codes.reshape(-1)]
+    return df
+
+
+def to_array(field: str, values: list[Any]):
+    if field == "@timestamp":
+        # Keep timestamps as 8-byte datetime64 values instead of ISO strings
+        return pd.to_datetime(values, utc=True).values
+    if field == "type":
+        return np.array(values, dtype=object)
+
+    array = np.array(values)
+    if array.dtype == object:
+        # Missing values come back as None, store them as NaN
+        array = np.array(values, dtype=float)
+    return array
+
+
+class ColumnarHits:
+    """Accumulate search hits page by page into typed per-field arrays."""
+
+    def __init__(self, fields: list[str]):
+        self.fields = fields
+        self.chunks = {field: [] for field in fields}
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def add_page(self, hits: list[dict[str, Any]]):
+        sources = [hit["_source"] for hit in hits]
+        for field in self.fields:
+            values = [source.get(field) for source in sources]
+            self.chunks[field].append(to_array(field, values))
+        self.rows += len(sources)
+
+    def extend(self, other: "ColumnarHits"):
+        for field in self.fields:
+            self.chunks[field].extend(other.chunks[field])
+        self.rows += other.rows
+
+    def to_dataframe(self):
+        columns = {}
+        for field, chunks in self.chunks.items():
+            column = np.concatenate(chunks) if chunks else np.array([])
+            if field == "@timestamp":
+                column = pd.Series(column, dtype="datetime64[ns]").dt.tz_localize("UTC")
+            columns[field] = column
+        # Free the page chunks as soon as the frame owns the data
+        self.chunks = {field: [] for field in self.fields}
+        self.rows = 0
+        return pd.DataFrame(columns, copy=False)
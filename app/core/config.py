@@ -1,24 +1,64 @@
 from elasticsearch import Elasticsearch
+from elastic_transport import Urllib3HttpNode
+from urllib3.connection import HTTPConnection
 import yaml
 import json
+import copy
+import os
+import socket
+import threading
 from typing import Any
 
 
+# Paths are resolved from here, not from the directory the process started in
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(APP_DIR)
+# Point at another config file, e.g. for cron runs of the CLI
+CONFIG_PATH_ENV = "PORTAL_REPORT_CONFIG"
+
+
+def resolve_path(path: str):
+    """Resolve repository-relative paths like "app/query/queries.json"."""
+    return path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
+
+
+def config_path():
+    return os.environ.get(CONFIG_PATH_ENV) or os.path.join(
+        APP_DIR, "connection_config.yaml"
+    )
+
+
 # Function to load YAML config
 # Change with your path and name file .yaml
 def load_config_elk():
     try:
-        with open("app/connection_config.yaml", "r") as file:
+        with open(config_path(), "r") as file:
             return yaml.safe_load(file)
     except Exception as e:
         raise Exception(f"Failed to load config file: {e}")
 
 
-elk_config = load_config_elk()
+elk_config = None
+elk_config_lock = threading.Lock()
+
+
+def get_elk_config():
+    """Load the config on first use, so importing core modules never reads it."""
+    global elk_config
+    if elk_config is None:
+        with elk_config_lock:
+            if elk_config is None:
+                elk_config = load_config_elk()
+    return elk_config
+
+
+def get_config(section: str, key: str, default: Any = None):
+    section_config = get_elk_config().get(section) or {}
+    return section_config.get(key, default)
 
 
 def index_source(selected_index: str):
-    index_source = elk_config["elkhub"]["index-source"]
+    index_source = get_elk_config()["elkhub"]["index-source"]
     if selected_index not in index_source:
         raise ValueError(
             f"Selected index '{selected_index}' not found in configuration."
@@ -26,25 +66,92 @@ def index_source(selected_index: str):
     return index_source[selected_index]
 
 
+es_client = None
+es_client_lock = threading.Lock()
+
+
 def elasticsearch_client():
+    """Return the process-wide client, every fetch and session shares its pool."""
+    global es_client
+    with es_client_lock:
+        if es_client is None:
+            es_client = create_elasticsearch_client()
+        return es_client
+
+
+def keep_alive_socket_options():
+    """TCP keep-alive probes for idle pooled connections, from the elkhub section."""
+    options = list(HTTPConnection.default_socket_options)
+    if not get_config("elkhub", "tcp_keepalive", True):
+        return options
+
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # Not every platform lets the probe timing be set per socket
+    for option, key, default in [
+        ("TCP_KEEPIDLE", "tcp_keepalive_idle", 60),
+        ("TCP_KEEPINTVL", "tcp_keepalive_interval", 10),
+        ("TCP_KEEPCNT", "tcp_keepalive_count", 6),
+    ]:
+        if hasattr(socket, option):
+            value = get_config("elkhub", key, default)
+            options.append((socket.IPPROTO_TCP, getattr(socket, option), value))
+    return options
+
+
+class KeepAliveHttpNode(Urllib3HttpNode):
+    """urllib3 node whose pooled connections use keep_alive_socket_options()."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.pool.conn_kw["socket_options"] = keep_alive_socket_options()
+
+
+def create_elasticsearch_client():
     try:
         es = Elasticsearch(
-            [elk_config["elkhub"]["url"]],
+            [get_elk_config()["elkhub"]["url"]],
             verify_certs=False,
             ssl_show_warn=False,
-            request_timeout=30,  # Request timeout (seconds)
+            request_timeout=get_config(
+                "elkhub", "request_timeout", 30
+            ),  # Request timeout (seconds)
             max_retries=10,  # Number of retries for failed requests
             retry_on_timeout=True,  # Retry on timeout error
             http_compress=True,
+            connections_per_node=get_config("elkhub", "connections_per_node", 10),
+            node_class=KeepAliveHttpNode,
         )
         return es
     except Exception as e:
         raise Exception(f"Failed to create Elasticsearch client: {e}")
 
 
+def client_pool_stats():
+    """Report how much of every node's connection pool is in use."""
+    if es_client is None:
+        return []
+
+    stats = []
+    for node in es_client.transport.node_pool.all():
+        pool = getattr(node, "pool", None)
+        idle_queue = getattr(pool, "pool", None)
+        stats.append(
+            {
+                "node": f"{node.config.host}:{node.config.port}",
+                "connections_per_node": node.config.connections_per_node,
+                "open_connections": getattr(pool, "num_connections", None),
+                "idle_connections": (
+                    idle_queue.qsize() if idle_queue is not None else None
+                ),
+                "requests": getattr(pool, "num_requests", None),
+            }
+        )
+    return stats
+
+
 def load_json(file_path="app/query/queries.json"):
     try:
-        with open(file_path, "r") as file:
+        with open(resolve_path(file_path), "r") as file:
             return json.load(file)
     except Exception as e:
         raise Exception(f"Failed to load JSON file: {e}")
@@ -57,6 +164,7 @@ def modify_query(
     end_time: dict[str, str],
     gt_type="gte",
 ):
+    query = copy.deepcopy(query)
     query["size"] = query_size
     range_filter = query["query"]["bool"]["filter"][0]["range"]["@timestamp"]
 
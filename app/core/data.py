@@ -1,16 +1,41 @@
 import pandas as pd
-import glob
-import sys
-import os
-from datetime import timedelta, timezone
-from typing import Any
+import pyarrow as pa
+import pyarrow.compute as pc
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable
+from elasticsearch import ConnectionError as ESConnectionError, ConnectionTimeout
+from core.cache import (
+    is_cache_enabled,
+    is_closed_period,
+    is_incremental_enabled,
+    load_cached_period,
+    load_partial_period,
+    partial_cache_key,
+    period_cache_key,
+    store_cached_period,
+    store_partial_period,
+)
+from core.columnar import WIB_OFFSET_NS, ColumnarHits, add_day_columns
+from core.plan import AGGREGATION_PLANS
+from core.store import get_result_store
+from core.streaming import StreamingTps
+from core.aggregation import build_aggregation_query, parse_day_buckets
+from util.time_range import split_month_ranges
 from core.config import (
     elasticsearch_client,
+    get_config,
     index_source,
     load_json,
     modify_query,
 )
 
+ARROW_FUNCTIONS = {"max": "max", "mean": "mean", "sum": "sum"}
+
+# Only keep what the pagination loop reads from every page response
+PAGE_FILTER_PATH = ["pit_id", "hits.hits._source", "hits.hits.sort"]
+
 
 def check_type(type: str):
     if type in ["QRIS", "WONDR"]:
@@ -20,46 +45,107 @@ def check_type(type: str):
 
 
 def calculate_tps(df_clear: pd.DataFrame, selected_types: str):
-    day_group = ["TRX_DATE", "type"] if selected_types in ["WONDR"] else ["TRX_DATE"]
-    month_group = (
-        ["per_month", "type"] if selected_types in ["WONDR"] else ["per_month"]
-    )
+    plan = AGGREGATION_PLANS[selected_types]
+
+    if get_config("fetch", "aggregation_backend", "pandas") == "pyarrow":
+        tps_per_day = aggregate_with_arrow(
+            df_clear,
+            plan["day_group"],
+            plan["day_aggregations"],
+            plan["percentile_field"],
+        )
+        tps_per_month = aggregate_with_arrow(
+            df_clear, plan["month_group"], plan["month_aggregations"]
+        )
+    else:
+        day_grouped = df_clear.groupby(plan["day_group"])
+        tps_per_day = day_grouped.agg(**plan["day_aggregations"])
+        tps_per_day["max_percentile_95"] = day_grouped[
+            plan["percentile_field"]
+        ].quantile(0.95)
+
+        # Calculate total and nominal transaction per month
+        tps_per_month = df_clear.groupby(plan["month_group"]).agg(
+            **plan["month_aggregations"]
+        )
 
-    field_path = "app/query/fields.json"
-    fields = load_json(field_path)
-    base_fields = fields.get(selected_types)
+    tps_per_day = tps_per_day[plan["day_columns"]].reset_index()
+    tps_per_month = tps_per_month.reset_index()
 
-    # Define aggregation logic for per-day calculations
-    day_aggregations = {
-        "max_tps": (base_fields["max"], "max"),
-        "avg_tps": (base_fields["avg"], "mean"),
-        "total_transaction_per_day": (base_fields["total"], "sum"),
-        "max_percentile_95": (base_fields["max"], lambda x: x.quantile(0.95)),
+    return {
+        "day": add_percent_change(tps_per_day, selected_types),
+        "month": tps_per_month,
     }
 
+
+def aggregate_with_arrow(
+    df: pd.DataFrame,
+    group: list[str],
+    aggregations: dict[str, tuple[str, str]],
+    percentile_field: str | None = None,
+):
+    """Run the plan's groupby on a pyarrow table, indexed by group like pandas agg.
+
+    The percentile comes from Arrow's t-digest, so it is approximate.
+    """
+    arrow_aggregations = [
+        (field, ARROW_FUNCTIONS[function]) for field, function in aggregations.values()
+    ]
+    names = list(aggregations)
+    if percentile_field is not None:
+        arrow_aggregations.append(
+            (percentile_field, "tdigest", pc.TDigestOptions(q=0.95))
+        )
+        names.append("max_percentile_95")
+
+    columns = list(dict.fromkeys(group + [field for field, *_ in arrow_aggregations]))
+    table = pa.Table.from_pandas(df[columns], preserve_index=False)
+    result = table.group_by(group).aggregate(arrow_aggregations).to_pandas()
+
+    aggregated = pd.DataFrame(
+        {
+            name: result[f"{field}_{function}"]
+            for name, (field, function, *_) in zip(names, arrow_aggregations)
+        }
+    )
+    if percentile_field is not None:
+        aggregated["max_percentile_95"] = aggregated["max_percentile_95"].str[0]
+
+    aggregated.index = pd.MultiIndex.from_frame(result[group])
+    if len(group) == 1:
+        aggregated.index = aggregated.index.get_level_values(0)
+    return aggregated.sort_index()
+
+
+def calculate_tps_from_buckets(tps_per_day: pd.DataFrame, selected_types: str):
+    month_group = AGGREGATION_PLANS[selected_types]["month_group"]
+
     month_aggregations = {
-        "total_transaction_per_month": (base_fields["total"], "sum"),
+        "total_transaction_per_month": ("total_transaction_per_day", "sum"),
     }
 
     if selected_types == "BNI Direct":
-        day_aggregations["nominal_transaction_per_day"] = (
-            base_fields["total_debit"],
-            "sum",
-        )
         month_aggregations["nominal_transaction_per_month"] = (
-            base_fields["total_debit"],
+            "nominal_transaction_per_day",
             "sum",
         )
 
-    # Sort column name by aplhabet
-    day_aggregations = dict(sorted(day_aggregations.items()))
-    tps_per_day = df_clear.groupby(day_group).agg(**day_aggregations).reset_index()
-
-    # Calculate total and nominal transaction per month
+    # Daily buckets already hold the per-day sums, so the month is their total
+    per_month = tps_per_day["TRX_DATE"].dt.strftime("%Y-%m")
     tps_per_month = (
-        df_clear.groupby(month_group).agg(**month_aggregations).reset_index()
+        tps_per_day.assign(per_month=per_month)
+        .groupby(month_group)
+        .agg(**month_aggregations)
+        .reset_index()
     )
 
+    return {
+        "day": add_percent_change(tps_per_day, selected_types),
+        "month": tps_per_month,
+    }
+
+
+def add_percent_change(tps_per_day: pd.DataFrame, selected_types: str):
     # Calculate transaction percent change
     if selected_types in ["WONDR"]:
         tps_per_day["transaction_percent_change"] = (
@@ -70,129 +156,495 @@ def calculate_tps(df_clear: pd.DataFrame, selected_types: str):
             tps_per_day["total_transaction_per_day"].pct_change() * 100
         ).fillna(0)
 
-    return {"day": tps_per_day, "month": tps_per_month}
+    return tps_per_day
 
 
 def rename_variable_tps(df_clear: pd.DataFrame, selected_types: str):
     if df_clear is not df_clear.empty:
         df = calculate_tps(df_clear, selected_types)
-        variable = check_type(selected_types)
+        return format_tps(df, selected_types)
+    else:
+        return {}
 
-        df["day"].rename(columns={"TRX_DATE": "@timestamp"}, inplace=True)
-        df["day"]["@timestamp"] = pd.to_datetime(
-            df["day"]["@timestamp"], format="%Y%m%d"
-        )
 
-        df["day"] = df["day"].sort_values(by="@timestamp")
-        df["day"]["@timestamp"] = df["day"]["@timestamp"].dt.strftime("%Y-%m-%d")
+def format_tps(df: dict[str, pd.DataFrame], selected_types: str):
+    variable = check_type(selected_types)
 
-        rename_tps_per_day = {
-            "@timestamp": f"{variable['REQ_TRX']} Date",
-            "max_tps": f"Max {variable['TPS_RPS']}",
-            "avg_tps": f"Avg {variable['TPS_RPS']}",
-            "max_percentile_95": f"Max {variable['TPS_RPS']} (95th Percentile)",
-            "total_transaction_per_day": f"Total {variable['REQ_TRX']} Per Day",
-            "transaction_percent_change": "Trx Pct Change",
-        }
+    df["day"].rename(columns={"TRX_DATE": "@timestamp"}, inplace=True)
 
-        rename_tps_per_month = {
-            "total_transaction_per_month": f"Total {variable['REQ_TRX']} Per Month",
-            "per_month": "Month",
-        }
+    df["day"] = df["day"].sort_values(by="@timestamp")
+    df["day"]["@timestamp"] = df["day"]["@timestamp"].dt.strftime("%Y-%m-%d")
 
-        df["day"] = df["day"].rename(columns=rename_tps_per_day)
-        df["month"] = df["month"].rename(columns=rename_tps_per_month)
-
-        if selected_types == "BNI Direct":
-            df["day"]["nominal_transaction_per_day"] = df["day"][
-                "nominal_transaction_per_day"
-            ].apply(lambda x: int(x))
-            df["day"] = df["day"].rename(
-                columns={
-                    "nominal_transaction_per_day": f"Nominal {variable['REQ_TRX']} Per Day"
-                }
-            )
+    rename_tps_per_day = {
+        "@timestamp": f"{variable['REQ_TRX']} Date",
+        "max_tps": f"Max {variable['TPS_RPS']}",
+        "avg_tps": f"Avg {variable['TPS_RPS']}",
+        "max_percentile_95": f"Max {variable['TPS_RPS']} (95th Percentile)",
+        "total_transaction_per_day": f"Total {variable['REQ_TRX']} Per Day",
+        "transaction_percent_change": "Trx Pct Change",
+    }
 
-            df["month"]["nominal_transaction_per_month"] = df["month"][
-                "nominal_transaction_per_month"
-            ].apply(lambda x: int(x))
-            df["month"] = df["month"].rename(
-                columns={
-                    "nominal_transaction_per_month": f"Nominal {variable['REQ_TRX']} Per Month"
-                }
-            )
-        elif selected_types == "WONDR":
-            df["day"] = df["day"].rename(columns={"type": "Type"})
-            df["month"] = df["month"].rename(columns={"type": "Type"})
+    rename_tps_per_month = {
+        "total_transaction_per_month": f"Total {variable['REQ_TRX']} Per Month",
+        "per_month": "Month",
+    }
 
-        return {
-            "data_pdf_day": df["day"],
-            "data_pdf_month": df["month"],
-        }
-    else:
-        return {}
+    df["day"] = df["day"].rename(columns=rename_tps_per_day)
+    df["month"] = df["month"].rename(columns=rename_tps_per_month)
 
+    if selected_types == "BNI Direct":
+        df["day"]["nominal_transaction_per_day"] = df["day"][
+            "nominal_transaction_per_day"
+        ].astype("int64")
+        df["day"] = df["day"].rename(
+            columns={
+                "nominal_transaction_per_day": f"Nominal {variable['REQ_TRX']} Per Day"
+            }
+        )
 
-def process_and_save_dataframe(all_results: list[dict[Any, Any]], selected_types: str):
-    try:
-        create_lock_file("process_and_save_dataframe")
-        if all_results:
+        df["month"]["nominal_transaction_per_month"] = df["month"][
+            "nominal_transaction_per_month"
+        ].astype("int64")
+        df["month"] = df["month"].rename(
+            columns={
+                "nominal_transaction_per_month": f"Nominal {variable['REQ_TRX']} Per Month"
+            }
+        )
+    elif selected_types == "WONDR":
+        df["day"] = df["day"].rename(columns={"type": "Type"})
+        df["month"] = df["month"].rename(columns={"type": "Type"})
 
-            df = pd.DataFrame(all_results)
+    return {
+        "data_pdf_day": df["day"],
+        "data_pdf_month": df["month"],
+    }
 
-            df["@timestamp"] = pd.to_datetime(df["@timestamp"]).dt.tz_convert("UTC")
-            wib_zone = timezone(timedelta(hours=7))
-            df["TRX_DATE"] = (
-                df["@timestamp"].dt.tz_convert(wib_zone).dt.strftime("%Y%m%d")
-            )
-            df["per_month"] = df["TRX_DATE"].str[:6].apply(lambda x: f"{x[:4]}-{x[4:]}")
 
+def process_and_save_dataframe(df: pd.DataFrame, selected_types: str):
+    try:
+        if not df.empty:
+            df = add_day_columns(df)
             tps = rename_variable_tps(df, selected_types)
             return tps
         else:
             return {}
     except Exception as e:
         print(e)
-        lock_files = glob.glob("*.lock")
-        for lock_file in lock_files:
-            os.remove(lock_file)
-    finally:
-        remove_lock_file("process_and_save_dataframe")
 
 
-def create_lock_file(lock_file_path: str):
-    """Create a lock file to prevent multiple instances."""
-    if os.path.exists(lock_file_path):
-        sys.exit(1)
-    else:
-        with open(lock_file_path, "w") as lock_file:
-            lock_file.write(str(os.getpid()))
+def report_data_key(times: dict[str, str], selected_types: str):
+    return (
+        selected_types,
+        times["start_time"],
+        times["end_time"],
+        times["last_month_start_time"],
+        times["last_month_end_time"],
+    )
+
+
+def get_report_data(times: dict[str, str], selected_types: str):
+    """Return main() for the selection, reusing a result computed by another format.
 
+    A format asking while another one is still fetching waits for that fetch.
+    """
+    return get_result_store().get_or_compute(
+        report_data_key(times, selected_types),
+        lambda: main(times, selected_types),
+        lambda data: any(data.values()),
+    )
+
+
+def prefetch_report_data(times: dict[str, str], types: list[str]):
+    """Fill the result store for several report types with one pipeline run.
+
+    In aggregation mode the queries of every type and period that cannot be
+    served from the local cache go to Elasticsearch as a single msearch, the
+    rest is fetched concurrently through fetch_period.
+    """
+    types = [
+        selected_types
+        for selected_types in types
+        if get_result_store().get(report_data_key(times, selected_types)) is None
+    ]
+    if not types:
+        return
+
+    query_size = 10000
+    queries = load_json("app/query/queries.json")
+    periods = {
+        "this_month": (times["start_time"], times["end_time"]),
+        "last_month": (times["last_month_start_time"], times["last_month_end_time"]),
+    }
+    requests = [
+        (selected_types, name, start_time, end_time)
+        for selected_types in types
+        for name, (start_time, end_time) in periods.items()
+    ]
+
+    results = {}
+    if get_config("fetch", "mode", "raw") == "aggregation":
+        batched = []
+        for request in requests:
+            selected_types, name, start_time, end_time = request
+            if len(split_month_ranges(start_time, end_time)) > 1:
+                # Ranges are composed from their months by fetch_range
+                continue
+            if is_cache_enabled() and is_closed_period(end_time):
+                cached = load_cached_period(
+                    period_cache_key(
+                        selected_types, start_time, end_time, queries.get(selected_types)
+                    )
+                )
+                if cached is not None:
+                    results[request] = cached
+                    continue
+            elif is_incremental_enabled():
+                # The open month is merged from its stored days by fetch_period
+                continue
+            batched.append(request)
+
+        for request, data in fetch_aggregated_batch(queries, batched).items():
+            selected_types, name, start_time, end_time = request
+            if data and is_cache_enabled() and is_closed_period(end_time):
+                store_cached_period(
+                    period_cache_key(
+                        selected_types, start_time, end_time, queries.get(selected_types)
+                    ),
+                    data,
+                )
+            results[request] = data
+
+    remaining = [request for request in requests if request not in results]
+    if remaining:
+        max_workers = get_config("fetch", "period_workers", 2) * len(types)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(remaining))) as executor:
+            futures = {
+                request: executor.submit(
+                    fetch_range,
+                    queries.get(request[0]),
+                    query_size,
+                    request[2],
+                    request[3],
+                    request[0],
+                )
+                for request in remaining
+            }
+            results.update(
+                {request: future.result() for request, future in futures.items()}
+            )
 
-def remove_lock_file(lock_file_path: str):
-    """Remove the lock file."""
-    if os.path.exists(lock_file_path):
-        os.remove(lock_file_path)
+    for selected_types in types:
+        data = {
+            name: results[(selected_types, name, *period)]
+            for name, period in periods.items()
+        }
+        if any(data.values()):
+            get_result_store().put(report_data_key(times, selected_types), data)
 
 
-def main(times: dict[str, str], selected_types: str):
+def main(
+    times: dict[str, str],
+    selected_types: str,
+    extra_periods: dict[str, tuple[str, str]] | None = None,
+):
     query_size = 10000
     query_path = "app/query/queries.json"
     queries = load_json(query_path)
     base_query = queries.get(selected_types)
 
-    df_this_month = fetch_data(
-        base_query, query_size, times["start_time"], times["end_time"], selected_types
+    periods = {
+        "this_month": (times["start_time"], times["end_time"]),
+        "last_month": (times["last_month_start_time"], times["last_month_end_time"]),
+        **(extra_periods or {}),
+    }
+
+    return fetch_periods(base_query, query_size, periods, selected_types)
+
+
+def fetch_periods(
+    base_query,
+    query_size,
+    periods: dict[str, tuple[str, str]],
+    selected_types: str,
+):
+    """Fetch every period concurrently and return the results keyed by period name."""
+    max_workers = get_config("fetch", "period_workers", 2)
+    max_workers = max(1, min(max_workers, len(periods)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            name: executor.submit(
+                fetch_range, base_query, query_size, start, end, selected_types
+            )
+            for name, (start, end) in periods.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def fetch_range(
+    base_query,
+    query_size,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+):
+    """Fetch a period, composing quarters and years from their months.
+
+    Every month goes through fetch_period, so closed months are read from the
+    local cache and a year costs about 365 stored day rows instead of a year of
+    documents.
+    """
+    month_ranges = split_month_ranges(start_time, end_time)
+    is_whole_months = (
+        month_ranges[0][0] == start_time and month_ranges[-1][1] == end_time
     )
-    df_last_month = fetch_data(
+    if len(month_ranges) == 1 or not is_whole_months:
+        return fetch_period(base_query, query_size, start_time, end_time, selected_types)
+
+    max_workers = get_config("fetch", "period_workers", 2)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(
+            executor.map(
+                lambda month_range: fetch_period(
+                    base_query, query_size, *month_range, selected_types
+                ),
+                month_ranges,
+            )
+        )
+    return combine_periods(results, selected_types)
+
+
+def combine_periods(results: list[dict[str, pd.DataFrame]], selected_types: str):
+    """Concatenate consecutive formatted periods into one, as if fetched at once.
+
+    Day and month rows are already final per period, only the day over day
+    change has to be recomputed across the period boundaries.
+    """
+    results = [result for result in results if result]
+    if not results:
+        return {}
+
+    variable = check_type(selected_types)
+    total_column = f"Total {variable['REQ_TRX']} Per Day"
+    day = pd.concat([result["data_pdf_day"] for result in results], ignore_index=True)
+    month = pd.concat(
+        [result["data_pdf_month"] for result in results], ignore_index=True
+    )
+
+    totals = (
+        day.groupby("Type")[total_column]
+        if selected_types in ["WONDR"]
+        else day[total_column]
+    )
+    day["Trx Pct Change"] = (totals.pct_change() * 100).fillna(0)
+
+    return {
+        "data_pdf_day": day,
+        "data_pdf_month": month,
+    }
+
+
+def fetch_period(
+    base_query,
+    query_size,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+):
+    # Closed months never change, serve them from the local cache when possible
+    use_cache = is_cache_enabled() and is_closed_period(end_time)
+    if use_cache:
+        cache_key = period_cache_key(selected_types, start_time, end_time, base_query)
+        cached = load_cached_period(cache_key)
+        if cached is not None:
+            return cached
+    elif is_incremental_enabled():
+        return fetch_incremental(
+            base_query, query_size, start_time, end_time, selected_types
+        )
+
+    data = query_period(base_query, query_size, start_time, end_time, selected_types)
+
+    if use_cache and data:
+        store_cached_period(cache_key, data)
+    return data
+
+
+def query_period(
+    base_query,
+    query_size,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+):
+    fetch_mode = get_config("fetch", "mode", "raw")
+    if fetch_mode == "aggregation":
+        try:
+            return fetch_aggregated(base_query, start_time, end_time, selected_types)
+        except Exception as e:
+            print(f"Aggregation failed, falling back to raw fetch: {e}")
+    elif fetch_mode == "stream":
+        return fetch_streaming(
+            base_query, query_size, start_time, end_time, selected_types
+        )
+
+    return fetch_data(base_query, query_size, start_time, end_time, selected_types)
+
+
+def fetch_aggregated(
+    base_query,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+):
+    client = elasticsearch_client()
+    index_source_elastic = index_source(selected_types)
+    query = build_aggregation_query(
         base_query,
-        query_size,
-        times["last_month_start_time"],
-        times["last_month_end_time"],
+        start_time,
+        end_time,
+        AGGREGATION_PLANS[selected_types]["base_fields"],
         selected_types,
     )
+    response = client.search(index=index_source_elastic, body=query)
+    return aggregated_result(response, selected_types)
+
+
+def fetch_aggregated_batch(
+    queries: dict[str, Any], requests: list[tuple[str, str, str, str]]
+):
+    """Run the aggregation query of every (type, period, start, end) in one msearch.
+
+    Requests whose search failed are left out of the result, so the caller
+    fetches them on their own.
+    """
+    if not requests:
+        return {}
+
+    searches = []
+    for selected_types, _, start_time, end_time in requests:
+        searches.append({"index": index_source(selected_types)})
+        searches.append(
+            build_aggregation_query(
+                queries.get(selected_types),
+                start_time,
+                end_time,
+                AGGREGATION_PLANS[selected_types]["base_fields"],
+                selected_types,
+            )
+        )
+
+    try:
+        responses = elasticsearch_client().msearch(searches=searches)["responses"]
+    except Exception as e:
+        print(f"Batched aggregation failed, fetching every period on its own: {e}")
+        return {}
+
+    results = {}
+    for request, response in zip(requests, responses):
+        if "error" in response:
+            print(f"Aggregation for {request[0]} {request[1]} failed: {response['error']}")
+            continue
+        try:
+            results[request] = aggregated_result(response, request[0])
+        except Exception as e:
+            print(f"Aggregation for {request[0]} {request[1]} failed: {e}")
+    return results
+
+
+def aggregated_result(response: dict[str, Any], selected_types: str):
+    # Buckets from a timed out search or failed shards only cover part of the data
+    shards = response.get("_shards", {})
+    if response.get("timed_out") or shards.get("failed"):
+        raise Exception(
+            f"Incomplete aggregation: {shards.get('failed', 0)} of "
+            f"{shards.get('total', 0)} shards failed, timed out: "
+            f"{response.get('timed_out', False)}"
+        )
 
-    return {"this_month": df_this_month, "last_month": df_last_month}
+    tps_per_day = parse_day_buckets(response, selected_types)
+    if tps_per_day.empty:
+        return {}
+
+    df = calculate_tps_from_buckets(tps_per_day, selected_types)
+    return format_tps(df, selected_types)
+
+
+def fetch_incremental(
+    base_query,
+    query_size,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+):
+    """Refresh the open month with only the documents after the last seen @timestamp.
+
+    Days before the newest day are kept as stored aggregates, the newest day is
+    kept as raw rows because later documents may still land in it. The new
+    documents are always pulled as raw rows, whatever fetch.mode is.
+
+    Documents indexed late can carry a @timestamp before the cursor, so the
+    last cache.incremental_overlap_minutes before it are fetched again.
+    """
+    partial_key = partial_cache_key(selected_types, start_time, end_time, base_query)
+    partial = load_partial_period(partial_key)
+
+    if partial is None:
+        stored_days = None
+        df = fetch_frame(base_query, query_size, start_time, end_time, selected_types)
+    else:
+        overlap = pd.Timedelta(
+            minutes=get_config("cache", "incremental_overlap_minutes", 10)
+        )
+        refetch_from = max(partial["cursor"] - overlap, pd.Timestamp(start_time))
+        # Stored days are final aggregates, a window reaching into one refetches it whole
+        wib_offset = pd.Timedelta(WIB_OFFSET_NS)
+        refetch_day = (
+            refetch_from.tz_convert("UTC").tz_localize(None) + wib_offset
+        ).normalize()
+        stored_days = partial["days"]
+        if (stored_days["TRX_DATE"] >= refetch_day).any():
+            refetch_from = max(
+                (refetch_day - wib_offset).tz_localize("UTC"), pd.Timestamp(start_time)
+            )
+        stored_days = stored_days[stored_days["TRX_DATE"] < refetch_day]
+
+        tail = partial["tail"][partial["tail"]["@timestamp"] < refetch_from]
+        new_rows = fetch_frame(
+            base_query,
+            query_size,
+            refetch_from.isoformat(),
+            end_time,
+            selected_types,
+        )
+        df = pd.concat([tail, new_rows], ignore_index=True)
+
+    if df.empty:
+        return {}
+
+    df = add_day_columns(df)
+    tps_per_day = calculate_tps(df, selected_types)["day"].drop(
+        columns="transaction_percent_change"
+    )
+
+    # Only the days present in the new rows are recomputed
+    if stored_days is not None:
+        stored_days = stored_days[~stored_days["TRX_DATE"].isin(tps_per_day["TRX_DATE"])]
+        tps_per_day = pd.concat([stored_days, tps_per_day], ignore_index=True)
+
+    day_group = AGGREGATION_PLANS[selected_types]["day_group"]
+    tps_per_day = tps_per_day.sort_values(by=day_group).reset_index(drop=True)
+
+    last_day = df["TRX_DATE"].max()
+    store_partial_period(
+        partial_key,
+        tps_per_day[tps_per_day["TRX_DATE"] < last_day],
+        df.loc[df["TRX_DATE"] == last_day, report_fields(selected_types)],
+        df["@timestamp"].max(),
+    )
+
+    df = calculate_tps_from_buckets(tps_per_day, selected_types)
+    return format_tps(df, selected_types)
 
 
 def fetch_data(
@@ -202,56 +654,265 @@ def fetch_data(
     end_time: dict[str, str],
     selected_types: str,
 ):
+    df = fetch_frame(base_query, query_size, start_time, end_time, selected_types)
+    if not df.empty:
+        dataframe = process_and_save_dataframe(df, selected_types)
+        return dataframe
+    else:
+        return {}
+
+
+def fetch_frame(
+    base_query,
+    query_size,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+):
+    all_hits = fetch_into(
+        base_query, query_size, start_time, end_time, selected_types, ColumnarHits
+    )
+    if all_hits:
+        return all_hits.to_dataframe()
+    else:
+        return pd.DataFrame()
+
+
+def fetch_streaming(
+    base_query,
+    query_size,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+):
+    aggregator = fetch_into(
+        base_query,
+        query_size,
+        start_time,
+        end_time,
+        selected_types,
+        lambda fields: StreamingTps(fields, selected_types),
+    )
+    return streamed_result(aggregator, selected_types)
+
+
+def streamed_result(aggregator: StreamingTps | None, selected_types: str):
+    if not aggregator:
+        return {}
+
+    df = calculate_tps_from_buckets(aggregator.to_day_frame(), selected_types)
+    return format_tps(df, selected_types)
+
+
+def fetch_into(
+    base_query,
+    query_size,
+    start_time: str,
+    end_time: str,
+    selected_types: str,
+    new_accumulator: Callable[[list[str]], Any],
+):
+    """Page every slice of the range into its own accumulator and merge them in order.
+
+    Errors are raised, the slices merged before a failure are not returned.
+    """
+    all_hits = None
+    cursor = None
     try:
-        rows_list = []
         client = elasticsearch_client()
         index_source_elastic = index_source(selected_types)
-        query = modify_query(base_query, query_size, start_time, end_time)
-        page = client.search(index=index_source_elastic, body=query)
-        hits = page["hits"]["hits"]
-
-        rows_list = [
-            {
-                "_id": hit["_id"],
-                **{field: hit["_source"].get(field) for field in hit["_source"]},
-            }
-            for hit in hits
-        ]
-
-        if len(rows_list) >= query_size:
-            if not rows_list:
-                print("No data found. Stopping pagination.")
-                return pd.DataFrame()
-            while hits:
-                query = modify_query(
-                    base_query,
-                    query_size,
-                    rows_list[-1]["@timestamp"],
-                    end_time,
-                    gt_type="gt",
-                )
-
-                response = client.search(index=index_source_elastic, body=query)
-                hits = response["hits"]["hits"]
-                if not hits:
-                    print("not hits")
-                    break
-
-                rows_list.extend(
-                    {
-                        "_id": hit["_id"],
-                        **{
-                            field: hit["_source"].get(field) for field in hit["_source"]
-                        },
-                    }
-                    for hit in hits
-                )
-
+        cursor = open_cursor(client, index_source_elastic)
+        fields = report_fields(selected_types)
+        all_hits = new_accumulator(fields)
+        projected_query = {**base_query, "_source": {"includes": fields}}
+
+        time_slices = fetch_time_slices(start_time, end_time)
+
+        def fetch_slice(time_slice: tuple[str, str]):
+            query = modify_query(projected_query, query_size, *time_slice)
+            slice_cursor = {"pit_id": cursor["pit_id"], "search_after": None}
+            slice_hits = new_accumulator(fields)
+            fetch_hits(client, query, slice_cursor, slice_hits)
+            return slice_hits
+
+        max_workers = get_config("fetch", "slice_concurrency", 4)
+        max_workers = max(1, min(max_workers, len(time_slices)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # map keeps the slice order, so the merged rows stay sorted by time
+            for slice_hits in executor.map(fetch_slice, time_slices):
+                all_hits.extend(slice_hits)
     except Exception as e:
+        # A partial range must not be reported or cached as the whole period
         print(f"Error during initial search: {e}")
+        raise
+    finally:
+        if cursor is not None:
+            close_cursor(client, cursor)
 
-    if len(rows_list) > 0:
-        dataframe = process_and_save_dataframe(rows_list, selected_types)
-        return dataframe
-    else:
+    return all_hits
+
+
+def fetch_raw(times: dict[str, str], selected_types: str, accumulator):
+    """Page this month's documents into the accumulator, in time order.
+
+    Slices are read one after another so rows reach the accumulator sorted, and
+    errors are raised instead of leaving a silently truncated export.
+    """
+    query_size = 10000
+    base_query = load_json("app/query/queries.json").get(selected_types)
+    client = elasticsearch_client()
+    cursor = open_cursor(client, index_source(selected_types))
+    try:
+        fields = report_fields(selected_types)
+        projected_query = {**base_query, "_source": {"includes": fields}}
+
+        for time_slice in fetch_time_slices(times["start_time"], times["end_time"]):
+            query = modify_query(projected_query, query_size, *time_slice)
+            slice_cursor = {"pit_id": cursor["pit_id"], "search_after": None}
+            fetch_hits(client, query, slice_cursor, accumulator)
+            cursor["pit_id"] = slice_cursor["pit_id"]
+    finally:
+        close_cursor(client, cursor)
+
+    return accumulator
+
+
+class PageTee:
+    """Hand every search page to several accumulators, so one pass feeds them all."""
+
+    def __init__(self, *accumulators):
+        self.accumulators = accumulators
+
+    def __len__(self):
+        return len(self.accumulators[0])
+
+    def add_page(self, hits: list[dict[str, Any]]):
+        for accumulator in self.accumulators:
+            accumulator.add_page(hits)
+
+
+def fetch_raw_report_data(times: dict[str, str], selected_types: str, writer):
+    """Page this month into the writer and return its report data from the same pass.
+
+    The rows are aggregated like fetch.mode "stream" does when it is configured,
+    otherwise like "raw" mode (the "aggregation" mode has no documents to share).
+    """
+    fields = report_fields(selected_types)
+    if get_config("fetch", "mode", "raw") == "stream":
+        aggregator = StreamingTps(fields, selected_types)
+        fetch_raw(times, selected_types, PageTee(writer, aggregator))
+        return streamed_result(aggregator, selected_types)
+
+    all_hits = ColumnarHits(fields)
+    fetch_raw(times, selected_types, PageTee(writer, all_hits))
+    if not all_hits:
         return {}
+    return process_and_save_dataframe(all_hits.to_dataframe(), selected_types)
+
+
+def fetch_last_month(times: dict[str, str], selected_types: str):
+    """Last month's report data, for reports that page this month themselves."""
+    stored = get_result_store().get(report_data_key(times, selected_types))
+    if stored is not None:
+        return stored["last_month"]
+
+    base_query = load_json("app/query/queries.json").get(selected_types)
+    return fetch_range(
+        base_query,
+        10000,
+        times["last_month_start_time"],
+        times["last_month_end_time"],
+        selected_types,
+    )
+
+
+def report_fields(selected_types: str):
+    """Return the only document fields calculate_tps reads for this type."""
+    base_fields = AGGREGATION_PLANS[selected_types]["base_fields"]
+    fields = ["@timestamp", *base_fields.values()]
+    if selected_types in ["WONDR"]:
+        fields.append("type")
+    return fields
+
+
+def fetch_time_slices(start_time: str, end_time: str):
+    slice_hours = get_config("fetch", "slice_hours", 0)
+    if slice_hours:
+        return split_time_range(start_time, end_time, slice_hours)
+    return [(start_time, end_time)]
+
+
+def split_time_range(start_time: str, end_time: str, slice_hours: int):
+    """Split [start_time, end_time) into consecutive slices of slice_hours."""
+    start = datetime.fromisoformat(start_time)
+    end = datetime.fromisoformat(end_time)
+    step = timedelta(hours=slice_hours)
+
+    time_slices = []
+    while start < end:
+        slice_end = min(start + step, end)
+        time_slices.append((start.isoformat(), slice_end.isoformat()))
+        start = slice_end
+    return time_slices
+
+
+def open_cursor(client, index_source_elastic: str):
+    """Open a point in time so every page reads the same snapshot of the index."""
+    keep_alive = get_config("fetch", "pit_keep_alive", "2m")
+    pit = client.open_point_in_time(index=index_source_elastic, keep_alive=keep_alive)
+    return {"pit_id": pit["id"], "search_after": None}
+
+
+def close_cursor(client, cursor: dict[str, Any]):
+    try:
+        client.close_point_in_time(id=cursor["pit_id"])
+    except Exception as e:
+        print(f"Failed to close point in time: {e}")
+
+
+def search_page(client, query: dict[str, Any], cursor: dict[str, Any]):
+    """Fetch the page after the cursor, retrying the same page on transient errors."""
+    keep_alive = get_config("fetch", "pit_keep_alive", "2m")
+    page_retries = get_config("fetch", "page_retries", 3)
+
+    page_query = {
+        **query,
+        "track_total_hits": False,
+        "pit": {"id": cursor["pit_id"], "keep_alive": keep_alive},
+        # _shard_doc breaks ties between hits sharing the same @timestamp
+        "sort": query["sort"] + [{"_shard_doc": "asc"}],
+    }
+    if cursor["search_after"] is not None:
+        page_query["search_after"] = cursor["search_after"]
+
+    for attempt in range(page_retries + 1):
+        try:
+            return client.search(body=page_query, filter_path=PAGE_FILTER_PATH)
+        except (ESConnectionError, ConnectionTimeout) as e:
+            if attempt == page_retries:
+                raise
+            print(f"Page request failed, retrying from the same cursor: {e}")
+            time.sleep(2**attempt)
+
+
+def fetch_hits(client, query: dict[str, Any], cursor: dict[str, Any], accumulator):
+    """Page through the point in time with search_after into the accumulator.
+
+    The cursor is updated after every page, so calling this again with the same
+    cursor resumes from the last page that was read.
+    """
+    while True:
+        response = search_page(client, query, cursor)
+        # filter_path drops the whole "hits" object when the page is empty
+        hits = response.get("hits", {}).get("hits", [])
+        if not hits:
+            break
+
+        accumulator.add_page(hits)
+
+        cursor["pit_id"] = response.get("pit_id", cursor["pit_id"])
+        cursor["search_after"] = hits[-1]["sort"]
+        if len(hits) < query["size"]:
+            break
+
+    return accumulator
@@ -1,69 +1,367 @@
+import numpy as np
 import pandas as pd
+import xlsxwriter
 from io import BytesIO
+from typing import Any, Callable
+from core.columnar import DAY_NS, WIB_OFFSET_NS, to_array
+from core.data import check_type
+from core.presentation import align_last_month, period_labels, tick_step
+from util.enums import Periods
 
+# Excel stops at 1,048,576 rows per sheet, the header takes the first one
+EXCEL_MAX_ROWS = 1048576
+# Serial number of 1970-01-01 in Excel's 1900 date system
+EXCEL_EPOCH_SERIAL = 25569
+RAW_SHEET_NAME = "Raw Data"
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+CHART_DATA_SHEET = "Chart Data"
+# Same colours as the matplotlib charts in core.presentation
+CHART_COLORS = {
+    "avg": "#008000",
+    "max": "#FF8C00",
+    "percentile": "#A52A2A",
+    "last_month": "#00BFFF",
+}
+CHART_SIZE = {"width": 1100, "height": 420}
+CHART_ROWS = 23
 
-def run_excel_test(data: pd.DataFrame) -> pd.DataFrame:
-    filtered_data_day = data["data_pdf_day"]
-    filtered_data_month = data["data_pdf_month"]
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        filtered_data_day.to_excel(writer, index=False, sheet_name="Day")
-        filtered_data_month.to_excel(writer, index=False, sheet_name="Month")
-        
-        workbook = writer.book
-        worksheet = writer.sheets["Day"]
-        
-        format_positive = workbook.add_format({"font_color": "#006100"})
-        format_negative = workbook.add_format({"font_color": "#9C0006"})
-        
-        trx_col = pct_col = None
-        for col_idx, col_name in enumerate(filtered_data_day.columns):
-            col_name_lower = col_name.lower()
-            if "total" in col_name_lower:
-                trx_col = col_idx
-            elif "pct" in col_name_lower:
-                pct_col = col_idx
-            elif "type" in col_name_lower:
-                max_row, max_col = filtered_data_day.shape
-                worksheet.autofilter(0, 0, max_row, 1)
-            if trx_col is not None and pct_col is not None:
-                break
-        
-        worksheet.conditional_format(
-            2,
-            trx_col,
-            len(filtered_data_day),
-            trx_col,
-            {
-                "type": "data_bar",
-                "bar_color": "#00FF00",
-                'bar_solid': True
-            }
+
+class RawSheetWriter:
+    """Write search hits into raw-data sheets as the pages arrive.
+
+    The workbook runs in constant_memory mode, so every finished row is flushed
+    to a temporary file and a new sheet is started once one reaches Excel's row
+    limit.
+    """
+
+    def __init__(self, workbook: xlsxwriter.Workbook, fields: list[str]):
+        self.workbook = workbook
+        self.fields = fields
+        self.header_format = workbook.add_format(HEADER_FORMAT)
+        self.date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        self.worksheet = None
+        self.sheets = 0
+        self.row = EXCEL_MAX_ROWS
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def new_sheet(self):
+        self.sheets += 1
+        name = RAW_SHEET_NAME if self.sheets == 1 else f"{RAW_SHEET_NAME} {self.sheets}"
+        self.worksheet = self.workbook.add_worksheet(name)
+        self.worksheet.set_column(0, 0, 20)
+        self.worksheet.write_row(
+            0, 0, ["Timestamp (WIB)", *self.fields[1:]], self.header_format
         )
-        worksheet.conditional_format(
-            2,
-            pct_col,
-            len(filtered_data_day),
-            pct_col,
-            {
-                "type": "cell",
-                "criteria": ">",
-                "value": 0,
-                "format": format_positive,
-            }
+        self.row = 1
+
+    def add_page(self, hits: list[dict[str, Any]]):
+        sources = [hit["_source"] for hit in hits]
+        timestamps = to_array(
+            "@timestamp", [source.get("@timestamp") for source in sources]
         )
-        worksheet.conditional_format(
-            2,
-            pct_col,
-            len(filtered_data_day),
-            pct_col,
+        # WIB wall clock time as an Excel serial date, computed for the whole page
+        serials = (
+            (timestamps.view("int64") + WIB_OFFSET_NS) / DAY_NS + EXCEL_EPOCH_SERIAL
+        ).tolist()
+
+        for serial, source in zip(serials, sources):
+            if self.row == EXCEL_MAX_ROWS:
+                self.new_sheet()
+            self.worksheet.write_number(self.row, 0, serial, self.date_format)
+            for col_idx, field in enumerate(self.fields[1:], start=1):
+                value = source.get(field)
+                if value is not None:
+                    self.worksheet.write(self.row, col_idx, value)
+            self.row += 1
+        self.rows += len(sources)
+
+
+def write_values(worksheet, row_idx: int, values: tuple):
+    for col_idx, value in enumerate(values):
+        # Blank cells like to_excel, xlsxwriter rejects NaN
+        if not pd.isna(value):
+            worksheet.write(row_idx, col_idx, value)
+
+
+def write_frame(worksheet, df: pd.DataFrame, header_format):
+    """Write the frame row by row, constant_memory cannot take pandas' column order."""
+    worksheet.write_row(0, 0, list(df.columns), header_format)
+    for row_idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        write_values(worksheet, row_idx, row)
+
+
+def write_block(worksheet, first_row: int, df: pd.DataFrame):
+    """Write the frame below first_row and return where its data can be referenced."""
+    worksheet.write_row(first_row, 0, list(df.columns))
+    for row_idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        write_values(worksheet, first_row + row_idx, row)
+    return {
+        "sheet": worksheet.name,
+        "first_row": first_row + 1,
+        "last_row": first_row + len(df),
+        "columns": list(df.columns),
+    }
+
+
+def chart_range(source: dict[str, Any], column: str):
+    col_idx = source["columns"].index(column)
+    return [source["sheet"], source["first_row"], col_idx, source["last_row"], col_idx]
+
+
+def max_label(values: pd.Series, position: str, color: str):
+    """Data labels showing only the highest point, like the PDF's annotation."""
+    max_position = int(np.argmax(values.to_numpy()))
+    return {
+        "value": True,
+        "position": position,
+        "font": {"bold": True, "color": color},
+        "custom": [
+            None if idx == max_position else {"delete": True}
+            for idx in range(len(values))
+        ],
+    }
+
+
+def build_chart(
+    workbook: xlsxwriter.Workbook,
+    variable: dict[str, str],
+    label: str,
+    this_month: pd.DataFrame,
+    source: dict[str, Any],
+    last_month: pd.DataFrame | None,
+    last_source: dict[str, Any] | None,
+    title_suffix: str,
+    period: str = Periods.MONTH.value,
+):
+    """Native version of generate_vertical_bar, reading its series from the sheets."""
+    date_column = f"{variable['REQ_TRX']} Date"
+    period_label = period_labels(period)
+    is_max = label == f"Max {variable['TPS_RPS']}"
+    chart = workbook.add_chart({"type": "column"})
+
+    series = (
+        [
+            (f"Avg {variable['TPS_RPS']}", CHART_COLORS["avg"]),
+            (label, CHART_COLORS["max"]),
+            (f"Max {variable['TPS_RPS']} (95th Percentile)", CHART_COLORS["percentile"]),
+        ]
+        if is_max
+        else [(label, CHART_COLORS["max"])]
+    )
+    for column, color in series:
+        options = {
+            "name": column if is_max else f"Total Request {period_label['this']}",
+            "categories": chart_range(source, date_column),
+            "values": chart_range(source, column),
+            "fill": {"color": color},
+            "border": {"none": True},
+        }
+        if column == label:
+            options["data_labels"] = max_label(this_month[label], "outside_end", "red")
+        chart.add_series(options)
+
+    if last_source is not None:
+        overlay = workbook.add_chart({"type": "line"})
+        overlay.add_series(
             {
-                "type": "cell",
-                "criteria": "<",
-                "value": 0,
-                "format": format_negative,
+                "name": (
+                    f"Max TPS {period_label['last']}"
+                    if is_max
+                    else f"Total Request {period_label['last']}"
+                ),
+                "values": chart_range(last_source, label),
+                "line": {"color": CHART_COLORS["last_month"], "width": 1.5},
+                "data_labels": max_label(last_month[label], "above", "black"),
             }
         )
+        chart.combine(overlay)
+
+    chart.set_title(
+        {"name": (f"{variable['TPS_RPS']} per Day" if is_max else label) + title_suffix}
+    )
+    chart.set_x_axis(
+        {
+            "name": f"{variable['REQ_TRX']} Date ({period_label['this']})",
+            "name_font": {"color": "red"},
+            "num_font": {"rotation": -45},
+            "interval_unit": tick_step(len(this_month)),
+        }
+    )
+    chart.set_legend({"position": "right"})
+    chart.set_size(CHART_SIZE)
+    return chart
+
+
+def add_charts(
+    workbook: xlsxwriter.Workbook,
+    chart_sheet,
+    data_sheet,
+    selected_type: str,
+    day: pd.DataFrame,
+    last_day: pd.DataFrame | None,
+    period: str = Periods.MONTH.value,
+):
+    """Add the Max and Total per day charts as native Excel charts.
+
+    The bars reference the Day sheet directly. Last month's overlay, and for
+    WONDR each type's rows (interleaved on the Day sheet), are copied as
+    contiguous blocks onto the chart data sheet.
+    """
+    variable = check_type(selected_type)
+    date_column = f"{variable['REQ_TRX']} Date"
+    labels = [f"Max {variable['TPS_RPS']}", f"Total {variable['REQ_TRX']} Per Day"]
+    has_last_month = last_day is not None and not last_day.empty
+
+    if "Type" in day:
+        groups = [
+            (
+                f" ({type_name})",
+                day[day["Type"] == type_name].reset_index(drop=True),
+                last_day[last_day["Type"] == type_name] if has_last_month else None,
+            )
+            for type_name in ["external", "internal"]
+        ]
+    else:
+        groups = [("", day.reset_index(drop=True), last_day if has_last_month else None)]
+
+    data_row = chart_row = 0
+    for title_suffix, this_month, last_month in groups:
+        if this_month.empty:
+            continue
+        if "Type" in day:
+            source = write_block(data_sheet, data_row, this_month)
+            data_row = source["last_row"] + 2
+        else:
+            source = {
+                "sheet": "Day",
+                "first_row": 1,
+                "last_row": len(day),
+                "columns": list(day.columns),
+            }
+
+        last_source = None
+        if last_month is not None and not last_month.empty:
+            last_month = align_last_month(this_month, last_month, date_column)
+            last_month[date_column] = last_month[date_column].dt.strftime("%Y-%m-%d")
+            last_month = last_month[[date_column, *labels]]
+            last_source = write_block(data_sheet, data_row, last_month)
+            data_row = last_source["last_row"] + 2
+
+        for label in labels:
+            chart = build_chart(
+                workbook,
+                variable,
+                label,
+                this_month,
+                source,
+                last_month,
+                last_source,
+                title_suffix,
+                period,
+            )
+            chart_sheet.insert_chart(chart_row, 0, chart)
+            chart_row += CHART_ROWS
+
+
+def run_excel_test(
+    data: pd.DataFrame,
+    selected_type: str,
+    last_month_data: dict[str, pd.DataFrame] | None = None,
+    write_raw: Callable[[xlsxwriter.Workbook], Any] | None = None,
+    period: str = Periods.MONTH.value,
+) -> pd.DataFrame:
+    """Build the workbook, None when there is no data for this month.
+
+    write_raw(workbook) streams the raw sheets in before the report sheets are
+    filled. When data is None it returns this month's data from that same pass.
+    """
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    # Added up front to keep the sheet order, the raw sheets go after them
+    worksheet = workbook.add_worksheet("Day")
+    month_sheet = workbook.add_worksheet("Month")
+    chart_sheet = workbook.add_worksheet("Charts")
+    data_sheet = workbook.add_worksheet(CHART_DATA_SHEET)
+
+    if write_raw is not None:
+        raw_data = write_raw(workbook)
+        data = raw_data if data is None else data
+    if not data:
+        workbook.close()
+        return None
+
+    filtered_data_day = data["data_pdf_day"]
+    filtered_data_month = data["data_pdf_month"]
+    header_format = workbook.add_format(HEADER_FORMAT)
+    write_frame(worksheet, filtered_data_day, header_format)
+    write_frame(month_sheet, filtered_data_month, header_format)
+
+    format_positive = workbook.add_format({"font_color": "#006100"})
+    format_negative = workbook.add_format({"font_color": "#9C0006"})
+
+    trx_col = pct_col = None
+    for col_idx, col_name in enumerate(filtered_data_day.columns):
+        col_name_lower = col_name.lower()
+        if "total" in col_name_lower:
+            trx_col = col_idx
+        elif "pct" in col_name_lower:
+            pct_col = col_idx
+        elif "type" in col_name_lower:
+            max_row, max_col = filtered_data_day.shape
+            worksheet.autofilter(0, 0, max_row, 1)
+        if trx_col is not None and pct_col is not None:
+            break
+
+    worksheet.conditional_format(
+        2,
+        trx_col,
+        len(filtered_data_day),
+        trx_col,
+        {
+            "type": "data_bar",
+            "bar_color": "#00FF00",
+            'bar_solid': True
+        }
+    )
+    worksheet.conditional_format(
+        2,
+        pct_col,
+        len(filtered_data_day),
+        pct_col,
+        {
+            "type": "cell",
+            "criteria": ">",
+            "value": 0,
+            "format": format_positive,
+        }
+    )
+    worksheet.conditional_format(
+        2,
+        pct_col,
+        len(filtered_data_day),
+        pct_col,
+        {
+            "type": "cell",
+            "criteria": "<",
+            "value": 0,
+            "format": format_negative,
+        }
+    )
+
+    add_charts(
+        workbook,
+        chart_sheet,
+        data_sheet,
+        selected_type,
+        filtered_data_day,
+        (last_month_data or {}).get("data_pdf_day"),
+        period,
+    )
+
+    workbook.close()
     output.seek(0)
 
     return output
@@ -1,73 +1,98 @@
 import streamlit as st
-import os
-import glob
 from typing import Any
 from streamlit.delta_generator import DeltaGenerator
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from core.loading import loading_animation
-from core.excel import run_excel_test
-from core.data import main, create_lock_file, remove_lock_file
-from core.pdf import dataframe_to_pdf
+from core.batch import batch_file_name, build_batch
+from core.jobs import Job, get_scheduler
+from core.report import REPORT_FORMATS, build_report, report_file_name
 
-excel_file_lock = "generate_excel.lock"
-pdf_file_lock = "generate_pdf.lock"
 
+def session_owner():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "default"
 
-def clear_lock_files():
-    lock_files = glob.glob("*.lock")
-    for lock_file in lock_files:
-        os.remove(lock_file)
 
+def wait_for_job(job: Job, placeholder: DeltaGenerator):
+    # Identical requests from other users share this job
+    while not job.wait(timeout=0.5):
+        loading_animation(placeholder, job.progress)
 
-def handle_excel_generate(
+    if job.error is not None:
+        raise job.error
+
+
+def handle_report_generate(
     times: dict[str, str],
     selected_detail: dict[str, Any],
+    report_format: str,
     placeholder: DeltaGenerator,
+    include_raw: bool = False,
 ):
     try:
-        create_lock_file(excel_file_lock)
-        loading_animation(placeholder, 0)
+        job = get_scheduler().submit(
+            (
+                selected_detail["type"],
+                selected_detail["month"],
+                selected_detail["year"],
+                report_format,
+                # Exports with and without the raw sheet are different files
+                *(["raw"] if include_raw else []),
+            ),
+            session_owner(),
+            build_report,
+            times,
+            selected_detail,
+            report_format,
+            True,
+            include_raw,
+        )
 
-        data_df = main(times, selected_detail["type"])
-        loading_animation(placeholder, 80)
+        wait_for_job(job, placeholder)
 
-        if not any(data_df.values()):
+        if job.result is None:
             st.warning("Data is empty")
             return
 
-        buffer = run_excel_test(data_df["this_month"])
-        loading_animation(placeholder, 90)
-
         st.download_button(
-            label="Download Excel",
-            data=buffer,
-            file_name=f"Report-{selected_detail['month']}-{selected_detail['year']}-{selected_detail['type']}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            label=REPORT_FORMATS[report_format]["label"],
+            data=job.result,
+            file_name=report_file_name(selected_detail, report_format),
+            mime=REPORT_FORMATS[report_format]["mime"],
         )
-        loading_animation(placeholder, 100)
     except Exception as e:
         st.error(f"An error occurred: {e}")
         print(f"Error: {e}")
-        clear_lock_files()
     finally:
-        remove_lock_file(excel_file_lock)
         placeholder.empty()
 
 
+def handle_excel_generate(
+    times: dict[str, str],
+    selected_detail: dict[str, Any],
+    placeholder: DeltaGenerator,
+    include_raw: bool = False,
+):
+    handle_report_generate(times, selected_detail, "xlsx", placeholder, include_raw)
+
+
 def generate_excel_file(
     times: dict[str, str],
     selected_detail: dict[str, Any],
 ):
     placeholder = st.empty()
+    include_raw = st.checkbox(
+        "Include raw data sheet",
+        help="Adds every per-second record of the month, split over several sheets past Excel's row limit.",
+    )
 
     if st.button("Generate Excel"):
-        if os.path.exists(excel_file_lock):
-            st.write("Excel generate is in progress. Please wait until it completes.")
-        else:
-            handle_excel_generate(
-                times,
-                selected_detail,
-                placeholder,
-            )
+        handle_excel_generate(
+            times,
+            selected_detail,
+            placeholder,
+            include_raw,
+        )
 
 
 def handle_pdf_generate(
@@ -75,49 +100,83 @@ def handle_pdf_generate(
     selected_detail: dict[str, Any],
     placeholder: DeltaGenerator,
 ):
-    try:
-        create_lock_file(pdf_file_lock)
-        loading_animation(placeholder, 0)
+    handle_report_generate(times, selected_detail, "pdf", placeholder)
+
+
+def generate_pdf_file(
+    times: dict[str, str],
+    selected_detail: dict[str, Any],
+):
+    placeholder = st.empty()
 
-        data_df = main(times, selected_detail["type"])
-        loading_animation(placeholder, 80)
+    if st.button("Generate PDF"):
+        handle_pdf_generate(
+            times,
+            selected_detail,
+            placeholder,
+        )
+
+
+def handle_batch_generate(
+    times: dict[str, str],
+    selected_detail: dict[str, Any],
+    report_formats: list[str],
+    placeholder: DeltaGenerator,
+):
+    try:
+        job = get_scheduler().submit(
+            (
+                "All types",
+                selected_detail["month"],
+                selected_detail["year"],
+                *report_formats,
+            ),
+            session_owner(),
+            build_batch,
+            times,
+            selected_detail,
+            report_formats,
+        )
+        wait_for_job(job, placeholder)
 
-        if not any(data_df.values()):
+        if job.result is None:
             st.warning("Data is empty")
             return
 
-        buffer = dataframe_to_pdf(
-            data_df,
-            selected_detail["type"],
+        st.caption(
+            f"Generated {len(job.result['files'])} files in {job.result['wall_time']:.1f}s"
         )
+        if job.result["empty"]:
+            st.warning(f"No data for {', '.join(job.result['empty'])}")
+        for file_name, error in job.result["failed"].items():
+            st.error(f"{file_name} failed: {error}")
 
-        loading_animation(placeholder, 100)
         st.download_button(
-            label="Download PDF",
-            data=buffer,
-            file_name=f"Report-{selected_detail['month']}-{selected_detail['year']}-{selected_detail['type']}.pdf",
-            mime="application/pdf",
+            label="Download ZIP",
+            data=job.result["buffer"],
+            file_name=batch_file_name(selected_detail),
+            mime="application/zip",
         )
     except Exception as e:
-        clear_lock_files()
         st.error(f"An error occurred: {e}")
+        print(f"Error: {e}")
     finally:
-        remove_lock_file(pdf_file_lock)
         placeholder.empty()
 
 
-def generate_pdf_file(
+def generate_batch_file(
     times: dict[str, str],
     selected_detail: dict[str, Any],
 ):
     placeholder = st.empty()
-
-    if st.button("Generate PDF"):
-        if os.path.exists(pdf_file_lock):
-            st.write("PDF generate is in progress. Please wait until it completes.")
-        else:
-            handle_pdf_generate(
-                times,
-                selected_detail,
-                placeholder,
-            )
+    report_formats = st.multiselect(
+        "Formats for all types", list(REPORT_FORMATS), default=list(REPORT_FORMATS)
+    )
+
+    if st.button("Generate all types (ZIP)", disabled=not report_formats):
+        handle_batch_generate(
+            times,
+            selected_detail,
+            report_formats,
+            placeholder,
+        )
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable
+from core.config import get_config
+
+
+class Job:
+    """A report job shared by every user that requested the same report."""
+
+    def __init__(self, key: tuple, owner: str, func: Callable, args: tuple):
+        self.key = key
+        self.owner = owner
+        self.func = func
+        self.args = args
+        self.status = "queued"
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def set_progress(self, progress: int):
+        self.progress = progress
+
+    def wait(self, timeout: float | None = None):
+        return self.done.wait(timeout)
+
+    def run(self):
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            self.result = self.func(*self.args, progress=self.set_progress)
+            self.status = "done"
+        except Exception as e:
+            print(f"Job {self.key} failed: {e}")
+            self.error = e
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+            self.done.set()
+
+
+class JobScheduler:
+    """Worker pool running report jobs.
+
+    Identical requests attach to the job that is already queued or running, and
+    owners (Streamlit sessions) are served round-robin so one user queueing many
+    reports cannot starve the others.
+    """
+
+    def __init__(self, workers: int):
+        self.queues = OrderedDict()
+        self.jobs = {}
+        self.condition = threading.Condition()
+        self.workers = [
+            threading.Thread(target=self.work, daemon=True, name=f"report-worker-{i}")
+            for i in range(max(1, workers))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, key: tuple, owner: str, func: Callable, *args: Any):
+        with self.condition:
+            job = self.jobs.get(key)
+            if job is not None:
+                return job
+
+            job = Job(key, owner, func, args)
+            self.jobs[key] = job
+            self.queues.setdefault(owner, deque()).append(job)
+            self.condition.notify()
+            return job
+
+    def next_job(self):
+        with self.condition:
+            while not self.queues:
+                self.condition.wait()
+
+            owner, queue = next(iter(self.queues.items()))
+            job = queue.popleft()
+            if queue:
+                self.queues.move_to_end(owner)
+            else:
+                del self.queues[owner]
+            return job
+
+    def work(self):
+        while True:
+            job = self.next_job()
+            job.run()
+            with self.condition:
+                if self.jobs.get(job.key) is job:
+                    del self.jobs[job.key]
+
+    def status(self):
+        with self.condition:
+            return [
+                {
+                    "report": " / ".join(str(part) for part in job.key),
+                    "status": job.status,
+                    "progress": job.progress,
+                }
+                for job in self.jobs.values()
+            ]
+
+
+scheduler = None
+scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global scheduler
+    with scheduler_lock:
+        if scheduler is None:
+            scheduler = JobScheduler(get_config("jobs", "workers", 2))
+        return scheduler
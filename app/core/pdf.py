@@ -1,11 +1,16 @@
 import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from fpdf import FPDF
-import os
+from fpdf.fonts import FontFace
 import dataframe_image as dfi
-import shutil
 import pandas as pd
+from core.config import get_config
 from core.presentation import generate_vertical_bar
 from core.data import check_type
+from util.enums import Periods
 from io import BytesIO
 from typing import Any
 
@@ -18,8 +23,9 @@ class PDF(FPDF):
         self.cell(0, 10, f"Page {self.page_no()}", align="C")
 
 
-RESOURCES_DIR = "resources"
 IMAGE_DPI = 150
+TABLE_FONT_SIZE = 8
+CHANGE_COLORS = {"red": (255, 0, 0), "green": (0, 128, 0), "black": (0, 0, 0)}
 
 
 def create_title(title, pdf):
@@ -47,8 +53,12 @@ def write_to_pdf(pdf, text):
     pdf.ln(10)
 
 
+def change_color(value):
+    return "red" if value < 0 else "green" if value > 0 else "black"
+
+
 def color_negative_red(value):
-    return f"color: {'red' if value < 0 else 'green' if value > 0 else 'black'}"
+    return f"color: {change_color(value)}"
 
 
 def style_dataframe(df: dict[str, Any], format_rules: dict[str, str]):
@@ -59,22 +69,150 @@ def style_dataframe(df: dict[str, Any], format_rules: dict[str, str]):
     )
 
 
-def export_to_image(styled_df, file_path: str):
-    dfi.export(styled_df, file_path, dpi=IMAGE_DPI, table_conversion="matplotlib")
+def export_to_image(styled_df):
+    buffer = BytesIO()
+    dfi.export(styled_df, buffer, dpi=IMAGE_DPI, table_conversion="matplotlib")
+    buffer.seek(0)
+    return buffer
+
+
+def format_cell(value, format_rule: str | None):
+    return format_rule.format(value) if format_rule else str(value)
+
+
+def write_table(pdf, df: pd.DataFrame, format_rules: dict[str, str], width=185):
+    """Draw the table as vector text, formatted like the rasterised version."""
+    pdf.set_text_color(r=0, g=0, b=0)
+    pdf.set_font("Helvetica", "", TABLE_FONT_SIZE)
+    with pdf.table(
+        width=width,
+        text_align="CENTER",
+        borders_layout="HORIZONTAL_LINES",
+        headings_style=FontFace(emphasis="BOLD"),
+    ) as table:
+        heading = table.row()
+        for column in df.columns:
+            heading.cell(str(column))
+
+        for values in df.itertuples(index=False):
+            row = table.row()
+            for column, value in zip(df.columns, values):
+                style = None
+                if column == "Trx Pct Change":
+                    style = FontFace(color=CHANGE_COLORS[change_color(value)])
+                row.cell(format_cell(value, format_rules.get(column)), style=style)
+    pdf.ln(5)
+
+
+def export_table(df: pd.DataFrame, format_rules: dict[str, str]):
+    if "Trx Pct Change" in df:
+        return export_to_image(style_dataframe(df, format_rules))
+    return export_to_image(df.style.format(format_rules).hide(axis="index"))
 
 
 def generate_charts(
     df_obj: dict[str, Any],
-    max_tps_path: str,
-    total_path: str,
     label_tps_rps: dict[str, str],
     label_req_trx: dict[str, str],
     selected_type: str,
+    period: str = Periods.MONTH.value,
 ):
-    generate_vertical_bar(df_obj, max_tps_path, f"Max {label_tps_rps}", selected_type)
-    generate_vertical_bar(
-        df_obj, total_path, f"Total {label_req_trx} Per Day", selected_type
-    )
+    return {
+        "verticalBarMax": (
+            generate_vertical_bar,
+            df_obj,
+            f"Max {label_tps_rps}",
+            selected_type,
+            period,
+        ),
+        "verticalBarTotal": (
+            generate_vertical_bar,
+            df_obj,
+            f"Total {label_req_trx} Per Day",
+            selected_type,
+            period,
+        ),
+    }
+
+
+def timed_render(render, *args):
+    start = time.perf_counter()
+    buffer = render(*args)
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+render_pool = None
+render_pool_lock = threading.Lock()
+# dataframe_image draws tables through pyplot's global state
+inline_render_lock = threading.Lock()
+
+
+def get_render_pool(workers: int):
+    global render_pool
+    with render_pool_lock:
+        if render_pool is None:
+            # spawn, forking the threaded Streamlit server is not safe
+            render_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return render_pool
+
+
+def reset_render_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next render starts a new one."""
+    global render_pool
+    with render_pool_lock:
+        if render_pool is pool:
+            render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_in_pool(tasks: dict[str, tuple], workers: int):
+    """Render in the shared pool, retried once on a new pool if a child crashed."""
+    for attempt in range(2):
+        pool = get_render_pool(workers)
+        try:
+            futures = {
+                name: pool.submit(timed_render, *task) for name, task in tasks.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+        except BrokenProcessPool as e:
+            # A crashed child breaks every pending and later task of the pool
+            reset_render_pool(pool)
+            if attempt:
+                raise
+            print(f"Render pool broke, retrying on a new pool: {e}")
+
+
+def render_images(tasks: dict[str, tuple]):
+    """Render every (function, *args) task, in the process pool when configured."""
+    start = time.perf_counter()
+    workers = get_config("pdf", "render_workers", 4)
+
+    if workers > 0:
+        results = render_in_pool(tasks, workers)
+    else:
+        with inline_render_lock:
+            results = {name: timed_render(*task) for name, task in tasks.items()}
+
+    images = {}
+    for name, (content, elapsed) in results.items():
+        print(f"Rendered {name} in {elapsed:.2f}s")
+        images[name] = BytesIO(content)
+    print(f"Rendered {len(images)} images in {time.perf_counter() - start:.2f}s")
+    return images
+
+
+def add_table(
+    tasks: dict[str, tuple],
+    name: str,
+    df: pd.DataFrame,
+    format_rules: dict[str, str],
+):
+    if get_config("pdf", "table_renderer", "native") == "image":
+        tasks[name] = (export_table, df, format_rules)
+    else:
+        tasks[name] = (df, format_rules)
 
 
 def process_dataframe(
@@ -83,21 +221,20 @@ def process_dataframe(
     output_prefix: str,
     variable: dict[str, str],
     selected_type: str,
+    tasks: dict[str, tuple],
+    period: str = Periods.MONTH.value,
 ):
-    styled_df = style_dataframe(df_obj["this_month"], format_rules)
-    data_image_path = f"{RESOURCES_DIR}/{output_prefix}.png"
-    export_to_image(styled_df, data_image_path)
+    add_table(tasks, output_prefix, df_obj["this_month"], format_rules)
 
-    max_tps_path = f"{RESOURCES_DIR}/{output_prefix}_verticalBarMax.png"
-    total_path = f"{RESOURCES_DIR}/{output_prefix}_verticalBarTotal.png"
-    generate_charts(
+    charts = generate_charts(
         df_obj,
-        max_tps_path,
-        total_path,
         variable["TPS_RPS"],
         variable["REQ_TRX"],
         selected_type,
+        period,
     )
+    for chart_name, chart_task in charts.items():
+        tasks[f"{output_prefix}_{chart_name}"] = chart_task
 
     return calculate_summary(df_obj["this_month"], variable["REQ_TRX"])
 
@@ -107,7 +244,9 @@ def handle_data(
     day_format_rules: dict[str, str],
     variable: dict[str, str],
     selected_type: str,
+    tasks: dict[str, tuple],
     is_wondr=False,
+    period: str = Periods.MONTH.value,
 ):
     if is_wondr:
         df_ext = {
@@ -133,10 +272,10 @@ def handle_data(
         }
 
         summary_ext = process_dataframe(
-            df_ext, day_format_rules, "data_ex", variable, selected_type
+            df_ext, day_format_rules, "data_ex", variable, selected_type, tasks, period
         )
         summary_in = process_dataframe(
-            df_in, day_format_rules, "data_in", variable, selected_type
+            df_in, day_format_rules, "data_in", variable, selected_type, tasks, period
         )
 
         return {
@@ -145,14 +284,17 @@ def handle_data(
         }
     else:
         summary = process_dataframe(
-            df_obj, day_format_rules, "data", variable, selected_type
+            df_obj, day_format_rules, "data", variable, selected_type, tasks, period
         )
         return {"summary": summary}
 
 
-def write_section(pdf, title, image_path, height=0, width=185):
+def write_section(pdf, title, image, height=0, width=185):
     write_to_pdf(pdf, title)
-    pdf.image(image_path, h=height, w=width)
+    if isinstance(image, tuple):
+        write_table(pdf, *image, width=width)
+    else:
+        pdf.image(image, h=height, w=width)
 
 
 def write_conclusion(pdf, req_or_trx, summary=None, summary_ext=None, summary_in=None):
@@ -178,35 +320,35 @@ def write_conclusion(pdf, req_or_trx, summary=None, summary_ext=None, summary_in
     write_to_pdf(pdf, conclusion_text)
 
 
-def write_pdf_content(pdf, type, variable, summary):
+def write_pdf_content(pdf, type, variable, summary, images, title="Monthly Report"):
 
     pdf.add_page()
-    create_title("Monthly Report", pdf)
+    create_title(title, pdf)
 
     if type != "WONDR":
         write_section(
             pdf,
             f"1. The table below illustrates the monthly {variable['REQ_TRX']}s of {type}:",
-            f"./{RESOURCES_DIR}/data.png",
+            images["data"],
         )
     else:
         write_section(
             pdf,
             f"1a. The table below illustrates the monthly {variable['REQ_TRX']}s of {type} external:",
-            f"./{RESOURCES_DIR}/data_ex.png",
+            images["data_ex"],
         )
         pdf.add_page()
         write_section(
             pdf,
             f"1b. The table below illustrates the monthly {variable['REQ_TRX']}s of {type} internal:",
-            f"./{RESOURCES_DIR}/data_in.png",
+            images["data_in"],
         )
 
     pdf.add_page()
     write_section(
         pdf,
         f"2. The table below illustrates total amount monthly {variable['REQ_TRX']}s:",
-        f"./{RESOURCES_DIR}/data_month.png",
+        images["data_month"],
     )
     pdf.ln(10)
 
@@ -214,34 +356,34 @@ def write_pdf_content(pdf, type, variable, summary):
         write_section(
             pdf,
             f"3. The visualisations below shows Max {variable['TPS_RPS']} and Total {variable['REQ_TRX']} per Day:",
-            f"./{RESOURCES_DIR}/data_verticalBarMax.png",
+            images["data_verticalBarMax"],
             75,
             199,
         )
         pdf.ln(10)
-        pdf.image(f"./{RESOURCES_DIR}/data_verticalBarTotal.png", h=75, w=199)
+        pdf.image(images["data_verticalBarTotal"], h=75, w=199)
         pdf.ln(10)
         write_conclusion(pdf, variable["req_trx"], summary=summary)
     else:
         write_section(
             pdf,
             f"3a. The visualisations below shows Max {variable['TPS_RPS']} and Total {variable['REQ_TRX']} external per Day:",
-            f"./{RESOURCES_DIR}/data_ex_verticalBarMax.png",
+            images["data_ex_verticalBarMax"],
             75,
             199,
         )
         pdf.ln(10)
-        pdf.image(f"./{RESOURCES_DIR}/data_ex_verticalBarTotal.png", h=75, w=199)
+        pdf.image(images["data_ex_verticalBarTotal"], h=75, w=199)
         pdf.add_page()
         write_section(
             pdf,
             f"3b. The visualisations below shows Max {variable['TPS_RPS']} and Total {variable['REQ_TRX']} internal per Day:",
-            f"./{RESOURCES_DIR}/data_in_verticalBarMax.png",
+            images["data_in_verticalBarMax"],
             75,
             199,
         )
         pdf.ln(10)
-        pdf.image(f"./{RESOURCES_DIR}/data_in_verticalBarTotal.png", h=75, w=199)
+        pdf.image(images["data_in_verticalBarTotal"], h=75, w=199)
         pdf.ln(10)
         write_conclusion(
             pdf,
@@ -267,7 +409,10 @@ def calculate_summary(df, REQ_or_TRX):
 
 
 def dataframe_to_pdf(
-    df_param: dict[str, pd.DataFrame | dict[str, Any] | dict | None], selected_type: str
+    df_param: dict[str, pd.DataFrame | dict[str, Any] | dict | None],
+    selected_type: str,
+    title: str = "Monthly Report",
+    period: str = Periods.MONTH.value,
 ):
     variable = check_type(selected_type)
 
@@ -280,9 +425,6 @@ def dataframe_to_pdf(
         ),
     }
 
-    if not os.path.exists("resources"):
-        os.makedirs("resources")
-
     day_format_rules = {
         "Trx Pct Change": "{:.2f}%",
         f"Total {variable['REQ_TRX']} Per Day": "{:,.0f}",
@@ -298,13 +440,16 @@ def dataframe_to_pdf(
         day_format_rules[f"Nominal {variable['REQ_TRX']} Per Day"] = "{:,.0f}"
         month_format_rules[f"Nominal {variable['REQ_TRX']} Per Month"] = "{:,.0f}"
 
+    tasks = {}
     if selected_type == "WONDR":
         summary = handle_data(
             df_obj,
             day_format_rules,
             variable,
             selected_type,
+            tasks,
             is_wondr=True,
+            period=period,
         )
     else:
         summary = handle_data(
@@ -312,15 +457,21 @@ def dataframe_to_pdf(
             day_format_rules,
             variable,
             selected_type,
+            tasks,
             is_wondr=False,
+            period=period,
         )
 
-    styled_df_month = (
-        df_param["this_month"]["data_pdf_month"]
-        .style.format(month_format_rules)
-        .hide(axis="index")
+    add_table(
+        tasks, "data_month", df_param["this_month"]["data_pdf_month"], month_format_rules
+    )
+    images = render_images(
+        {name: task for name, task in tasks.items() if callable(task[0])}
+    )
+    # Native tables are drawn straight into the PDF from their data
+    images.update(
+        {name: task for name, task in tasks.items() if not callable(task[0])}
     )
-    export_to_image(styled_df_month, f"./{RESOURCES_DIR}/data_month.png")
 
     pdf = PDF()
 
@@ -329,11 +480,10 @@ def dataframe_to_pdf(
         selected_type,
         variable,
         summary,
+        images,
+        title,
     )
 
-    if os.path.exists(f"{RESOURCES_DIR}"):
-        shutil.rmtree(f"{RESOURCES_DIR}")
-
     buffer = BytesIO()
     buffer.write(pdf.output(dest="S"))
     buffer.seek(0)
@@ -0,0 +1,68 @@
+from core.config import load_json
+from util.enums import Types
+
+REQUIRED_FIELDS = ["max", "avg", "total"]
+
+
+def build_aggregation_plan(selected_types: str, base_fields: dict[str, str]):
+    """Describe the calculate_tps groupby for a report type with built-in reductions."""
+    is_wondr = selected_types in ["WONDR"]
+
+    day_aggregations = {
+        "max_tps": (base_fields["max"], "max"),
+        "avg_tps": (base_fields["avg"], "mean"),
+        "total_transaction_per_day": (base_fields["total"], "sum"),
+    }
+
+    month_aggregations = {
+        "total_transaction_per_month": (base_fields["total"], "sum"),
+    }
+
+    if selected_types == "BNI Direct":
+        day_aggregations["nominal_transaction_per_day"] = (
+            base_fields["total_debit"],
+            "sum",
+        )
+        month_aggregations["nominal_transaction_per_month"] = (
+            base_fields["total_debit"],
+            "sum",
+        )
+
+    return {
+        "base_fields": base_fields,
+        "day_group": ["TRX_DATE", "type"] if is_wondr else ["TRX_DATE"],
+        "month_group": ["per_month", "type"] if is_wondr else ["per_month"],
+        "day_aggregations": day_aggregations,
+        "month_aggregations": month_aggregations,
+        # The 95th percentile runs as its own groupby quantile, off the lambda path
+        "percentile_field": base_fields["max"],
+        # Sort column name by aplhabet
+        "day_columns": sorted([*day_aggregations, "max_percentile_95"]),
+    }
+
+
+def load_aggregation_plans(field_path="app/query/fields.json"):
+    fields = load_json(field_path)
+    plans = {}
+    for report_type in Types:
+        base_fields = fields.get(report_type.value)
+        if base_fields is None:
+            raise ValueError(f"No fields configured for report type '{report_type.value}'.")
+
+        required = REQUIRED_FIELDS + (
+            ["total_debit"] if report_type.value == "BNI Direct" else []
+        )
+        missing = [field for field in required if field not in base_fields]
+        if missing:
+            raise ValueError(
+                f"Fields {missing} missing for report type '{report_type.value}'."
+            )
+
+        plans[report_type.value] = build_aggregation_plan(
+            report_type.value, base_fields
+        )
+    return plans
+
+
+# Loaded and validated once when the app starts
+AGGREGATION_PLANS = load_aggregation_plans()
@@ -1,8 +1,25 @@
-import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from core.config import get_config
 from core.data import check_type
+from util.enums import Periods
 from typing import Any
 import pandas as pd
+from io import BytesIO
+
+
+CHART_FIGSIZE = (15, 6)
+# Width of the chart image in the PDF (write_pdf_content embeds it at w=199)
+CHART_EMBED_WIDTH_MM = 199
+# Longer ranges label every few days so quarter and year charts stay readable
+MAX_CHART_TICKS = 31
+
+
+def chart_dpi():
+    """Save DPI that gives chart_ppi pixels per inch at the PDF embed size."""
+    embed_width_inch = CHART_EMBED_WIDTH_MM / 25.4
+    return get_config("pdf", "chart_ppi", 200) * embed_width_inch / CHART_FIGSIZE[0]
 
 
 # def format_number(num):
@@ -29,6 +46,28 @@ def find_specific_day(df_obj, target_day):
          return matching_dates[0]
 
 
+def period_labels(period: str = Periods.MONTH.value):
+    """Name the compared periods in chart labels, e.g. "This Quarter" and "Last Quarter"."""
+    return {"this": f"This {period}", "last": f"Last {period}"}
+
+
+def tick_step(days: int):
+    return max(1, -(-days // MAX_CHART_TICKS))
+
+
+def align_last_month(
+    df_this_month: pd.DataFrame, df_last_month: pd.DataFrame, date_column: str
+):
+    """Drop last month's days before the weekday this month starts on."""
+    first_day_this_month = check_date_day(df_this_month[date_column])
+    df_last_month = df_last_month.reset_index(drop=True)
+    day_last_month = find_specific_day(df_last_month[date_column], first_day_this_month)
+    df_last_month[date_column] = pd.to_datetime(df_last_month[date_column])
+    return df_last_month[df_last_month[date_column] >= day_last_month].reset_index(
+        drop=True
+    )
+
+
 def bar_chart(ax, x_axis, df_obj, width, color: str, label: dict[str, str], offset=0):
     bars = ax.bar(
         x_axis + offset,
@@ -39,7 +78,7 @@ def bar_chart(ax, x_axis, df_obj, width, color: str, label: dict[str, str], offs
     )
     for bar in bars:
         height = bar.get_height()
-        plt.text(
+        ax.text(
             bar.get_x() + bar.get_width() / 2,
             height,
             "",
@@ -71,19 +110,25 @@ def add_annotation(ax, text, x, y, isBar=True):
         fontweight="bold",
         color="red" if isBar else "black",
     )  # -> create annotation for chart
-    plt.scatter([x], [y], color="navy", marker="*", s=100) # -> for star logo
+    ax.scatter([x], [y], color="navy", marker="*", s=100)  # -> for star logo
 
 
 def generate_vertical_bar(
-    df: dict[str, Any], filename: str, label: dict[str, str], selected_type: str
+    df: dict[str, Any],
+    label: dict[str, str],
+    selected_type: str,
+    period: str = Periods.MONTH.value,
 ):
     variable = check_type(selected_type)
+    period_label = period_labels(period)
     chart = {"fontsize": 12, "fontsize_title": 14, "fontweight": "bold", "pad": 20}
     df_this_month = df["this_month"].reset_index(drop=True)  # -> get first 10 data
-    first_day_this_month = check_date_day(df_this_month[f"{variable['REQ_TRX']} Date"])
     max_index_thismonth = df_this_month[label].idxmax()  # -> get index for line chart
     max_value_thismonth = df_this_month[label].max()  # -> get max value for line chart
-    fig, ax = plt.subplots(figsize=(15, 6))
+    # Object-oriented Agg figure, nothing is registered in pyplot's global state
+    fig = Figure(figsize=CHART_FIGSIZE)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
     width = 0.2
     x = np.arange(len(df_this_month[f"{variable['REQ_TRX']} Date"]))
     if label == f"Max {variable['TPS_RPS']}":
@@ -113,7 +158,7 @@ def generate_vertical_bar(
             f"Max {variable['TPS_RPS']} (95th Percentile)",
             offset=width,
         )
-        plt.title(
+        ax.set_title(
             f"{variable['TPS_RPS']} per Day",
             fontweight=chart["fontweight"],
             fontsize=chart["fontsize_title"],
@@ -126,9 +171,9 @@ def generate_vertical_bar(
             df_this_month[label],
             width,
             "darkorange",
-            "Total Request This Month",
+            f"Total Request {period_label['this']}",
         )
-        plt.title(
+        ax.set_title(
             label,
             fontweight=chart["fontweight"],
             fontsize=chart["fontsize_title"],
@@ -141,16 +186,9 @@ def generate_vertical_bar(
         max_value_thismonth,
     )
     if not df["last_month"].empty:
-        df_last_month = df["last_month"].reset_index(drop=True)
-        day_last_month = find_specific_day(
-            df_last_month[f"{variable['REQ_TRX']} Date"], first_day_this_month
+        df_filtered = align_last_month(
+            df_this_month, df["last_month"], f"{variable['REQ_TRX']} Date"
         )
-        df_last_month[f"{variable['REQ_TRX']} Date"] = pd.to_datetime(
-            df_last_month[f"{variable['REQ_TRX']} Date"]
-        )
-        df_filtered = df_last_month[
-            df_last_month[f"{variable['REQ_TRX']} Date"] >= day_last_month
-        ].reset_index(drop=True)
         x_mapped = np.arange(len(df_filtered))
         df_filter = df_filtered[label]
 
@@ -162,7 +200,11 @@ def generate_vertical_bar(
             x_mapped,
             df_filter,
             "deepskyblue",
-            "Max TPS Last Month" if label == f"Max {variable['TPS_RPS']}" else "Total Request Last Month",
+            (
+                f"Max TPS {period_label['last']}"
+                if label == f"Max {variable['TPS_RPS']}"
+                else f"Total Request {period_label['last']}"
+            ),
         )
         add_annotation(
             ax,
@@ -174,27 +216,42 @@ def generate_vertical_bar(
         # Add another label for last month data
         ax_top = ax.twiny()
         ax_top.set_xlim(ax.get_xlim())  # -> make sure both axes are in the same line
-        ax_top.set_xticks(x_mapped)  # -> how much ticks for date
+        # -> how much ticks for date
+        ax_top.set_xticks(x_mapped[:: tick_step(len(x_mapped))])
         ax_top.set_xlabel(
-            f"{variable['REQ_TRX']} Date (Last Month)",
+            f"{variable['REQ_TRX']} Date ({period_label['last']})",
             fontsize=chart["fontsize"],
             fontweight=chart["fontweight"],
             loc="left",
         )
         ax_top.set_xticklabels(
-            df_filtered[f"{variable['REQ_TRX']} Date"].dt.strftime("%Y-%m-%d"), rotation=45
+            df_filtered[f"{variable['REQ_TRX']} Date"]
+            .dt.strftime("%Y-%m-%d")
+            .iloc[:: tick_step(len(x_mapped))],
+            rotation=45,
         )
 
     # Add label
     ax.set_xlabel(
-        f"{variable['REQ_TRX']} Date (This Month)",
+        f"{variable['REQ_TRX']} Date ({period_label['this']})",
         fontsize=12,
         color="red",
         fontweight=chart["fontweight"],
         loc="left",
     )
-    ax.set_xticks(x)  # -> how much ticks for date
-    ax.set_xticklabels(df_this_month[f"{variable['REQ_TRX']} Date"], rotation=45)
+    ax.set_xticks(x[:: tick_step(len(x))])  # -> how much ticks for date
+    ax.set_xticklabels(
+        df_this_month[f"{variable['REQ_TRX']} Date"].iloc[:: tick_step(len(x))],
+        rotation=45,
+    )
     ax.legend(bbox_to_anchor=(1, 1), loc="upper left")
-    plt.tight_layout()
-    plt.savefig(filename, dpi=300, bbox_inches="tight", pad_inches=0)
+    fig.tight_layout()
+    buffer = BytesIO()
+    fig.savefig(
+        buffer, format="png", dpi=chart_dpi(), bbox_inches="tight", pad_inches=0
+    )
+    buffer.seek(0)
+
+    # Drop the artists right away instead of waiting for the garbage collector
+    fig.clear()
+    return buffer
@@ -0,0 +1,113 @@
+from typing import Any, Callable
+from core.artifacts import (
+    artifact_key,
+    load_artifact,
+    load_pregenerated,
+    store_artifact,
+)
+from core.cache import is_closed_period
+from core.data import (
+    fetch_last_month,
+    fetch_raw_report_data,
+    get_report_data,
+    report_fields,
+)
+from core.excel import RawSheetWriter, run_excel_test
+from core.pdf import dataframe_to_pdf
+from util.enums import Periods
+
+REPORT_FORMATS = {
+    "xlsx": {
+        "label": "Download Excel",
+        "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    },
+    "pdf": {
+        "label": "Download PDF",
+        "mime": "application/pdf",
+    },
+}
+
+REPORT_TITLES = {
+    Periods.MONTH.value: "Monthly Report",
+    Periods.QUARTER.value: "Quarterly Report",
+    Periods.YEAR.value: "Yearly Report",
+}
+
+
+def report_file_name(selected_detail: dict[str, Any], report_format: str):
+    return f"Report-{selected_detail['month']}-{selected_detail['year']}-{selected_detail['type']}.{report_format}"
+
+
+def write_raw_sheet(times: dict[str, str], selected_type: str):
+    def write_raw(workbook):
+        return fetch_raw_report_data(
+            times,
+            selected_type,
+            RawSheetWriter(workbook, report_fields(selected_type)),
+        )
+
+    return write_raw
+
+
+def build_report(
+    times: dict[str, str],
+    selected_detail: dict[str, Any],
+    report_format: str,
+    use_pregenerated: bool = True,
+    include_raw: bool = False,
+    progress: Callable[[int], None] = lambda progress: None,
+):
+    """Fetch the data and render the report, returns None when there is no data."""
+    progress(0)
+    period = selected_detail.get("period", Periods.MONTH.value)
+
+    if report_format == "xlsx" and include_raw:
+        # One pass over this month feeds the raw sheets and its aggregates. The
+        # export depends on every document, so it is not kept as an artifact
+        last_month = fetch_last_month(times, selected_detail["type"])
+        progress(20)
+        buffer = run_excel_test(
+            None,
+            selected_detail["type"],
+            last_month,
+            write_raw_sheet(times, selected_detail["type"]),
+            period,
+        )
+        progress(100)
+        return buffer
+
+    # Closed months may already be rendered by the pre-generation job
+    if use_pregenerated and is_closed_period(times["end_time"]):
+        buffer = load_pregenerated(report_file_name(selected_detail, report_format))
+        if buffer is not None:
+            progress(100)
+            return buffer
+
+    data_df = get_report_data(times, selected_detail["type"])
+    progress(80)
+
+    if not any(data_df.values()):
+        return None
+
+    # Identical data rendered with the same template gives the same file
+    key = artifact_key(selected_detail["type"], times, report_format, data_df)
+    buffer = load_artifact(key, report_format)
+    if buffer is None:
+        if report_format == "xlsx":
+            buffer = run_excel_test(
+                data_df["this_month"],
+                selected_detail["type"],
+                data_df["last_month"],
+                period=period,
+            )
+        else:
+            buffer = dataframe_to_pdf(
+                data_df,
+                selected_detail["type"],
+                REPORT_TITLES[period],
+                period,
+            )
+        store_artifact(key, report_format, buffer)
+
+    progress(100)
+    return buffer
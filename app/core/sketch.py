@@ -0,0 +1,73 @@
+import math
+import numpy as np
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a bounded relative error (DDSketch).
+
+    Values are counted in logarithmic buckets, so any quantile is returned within
+    relative_accuracy of the exact (linearly interpolated) value and two sketches
+    merge by adding counts.
+    Only non-negative values are expected (TPS/RPS), negatives count as zero.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add_array(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+
+        keys, counts = np.unique(
+            np.ceil(np.log(positive) / self.log_gamma).astype("int64"),
+            return_counts=True,
+        )
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def merge(self, other: "QuantileSketch"):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def value_at(self, rank: int):
+        """Estimate of the value at 0-based position rank in sorted order."""
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                break
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def quantile(self, q: float):
+        """Interpolate linearly between the two nearest ranks, like pandas.
+
+        Both ranks are estimated within relative_accuracy and the result is a
+        weighted mean of them, so it stays within relative_accuracy of
+        Series.quantile(q) on the same values.
+        """
+        if not self.count:
+            return float("nan")
+
+        rank = q * (self.count - 1)
+        lower_rank = math.floor(rank)
+        lower = self.value_at(lower_rank)
+        if lower_rank == rank:
+            return lower
+        upper = self.value_at(lower_rank + 1)
+        return lower + (upper - lower) * (rank - lower_rank)
@@ -0,0 +1,110 @@
+import threading
+import time
+import pandas as pd
+from collections import OrderedDict
+from typing import Any, Callable
+from core.config import get_config
+
+
+def result_size(result: Any):
+    """Approximate the memory held by the frames inside a result."""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, dict):
+        return sum(result_size(value) for value in result.values())
+    return 0
+
+
+class ResultStore:
+    """In-memory LRU store of computed report data with a TTL and a size bound."""
+
+    def __init__(self, ttl_seconds: int, max_size_mb: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size_mb * 1024 * 1024
+        self.entries = OrderedDict()
+        self.total_size = 0
+        self.lock = threading.Lock()
+        # key -> [lock held while the value is computed, number of callers]
+        self.pending = {}
+
+    def get(self, key: tuple):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, size, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self.entries[key]
+                self.total_size -= size
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: Any):
+        size = result_size(value)
+        if size > self.max_size:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.total_size -= self.entries.pop(key)[1]
+            self.entries[key] = (time.monotonic(), size, value)
+            self.total_size += size
+
+            while self.total_size > self.max_size:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.total_size -= evicted_size
+
+    def get_or_compute(
+        self,
+        key: tuple,
+        compute: Callable[[], Any],
+        is_storable: Callable[[Any], bool] = lambda value: True,
+    ):
+        """Return the stored value, computing it once when several callers miss at once.
+
+        Callers of the same key wait for the first one and read its result from
+        the store, a failed or unstored computation is retried by the next caller.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self.lock:
+            pending = self.pending.setdefault(key, [threading.Lock(), 0])
+            pending[1] += 1
+        try:
+            with pending[0]:
+                value = self.get(key)
+                if value is None:
+                    value = compute()
+                    if is_storable(value):
+                        self.put(key, value)
+                return value
+        finally:
+            with self.lock:
+                pending[1] -= 1
+                if pending[1] == 0:
+                    del self.pending[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_size = 0
+
+
+result_store = None
+result_store_lock = threading.Lock()
+
+
+def get_result_store():
+    global result_store
+    with result_store_lock:
+        if result_store is None:
+            result_store = ResultStore(
+                ttl_seconds=get_config("result_store", "ttl_seconds", 300),
+                max_size_mb=get_config("result_store", "max_size_mb", 256),
+            )
+        return result_store
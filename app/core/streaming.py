@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from typing import Any
+from core.aggregation import restore_integer
+from core.columnar import ColumnarHits, add_day_columns
+from core.config import get_config
+from core.plan import AGGREGATION_PLANS
+from core.sketch import QuantileSketch
+
+
+class StreamingTps:
+    """Fold every page into running per-day (and per-type) aggregates.
+
+    Only the running max, sums, counts and a quantile sketch are kept per group,
+    so memory grows with the number of days instead of the number of documents.
+    """
+
+    def __init__(self, fields: list[str], selected_types: str):
+        self.fields = fields
+        self.selected_types = selected_types
+        plan = AGGREGATION_PLANS[selected_types]
+        self.base_fields = plan["base_fields"]
+        self.day_group = plan["day_group"]
+        self.relative_accuracy = get_config("fetch", "sketch_accuracy", 0.01)
+        self.groups = {}
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def add_page(self, hits: list[dict[str, Any]]):
+        page_hits = ColumnarHits(self.fields)
+        page_hits.add_page(hits)
+        page = add_day_columns(page_hits.to_dataframe())
+
+        max_field = self.base_fields["max"]
+        avg_field = self.base_fields["avg"]
+        total_field = self.base_fields["total"]
+        debit_field = self.base_fields.get("total_debit")
+
+        for key, group in page.groupby(self.day_group):
+            state = self.groups.get(key)
+            if state is None:
+                state = {
+                    "max": float("nan"),
+                    "avg_sum": 0,
+                    "avg_count": 0,
+                    "total": 0,
+                    "nominal": 0,
+                    "sketch": QuantileSketch(self.relative_accuracy),
+                }
+                self.groups[key] = state
+
+            state["max"] = np.fmax(state["max"], group[max_field].max())
+            state["avg_sum"] += group[avg_field].sum()
+            state["avg_count"] += group[avg_field].count()
+            state["total"] += group[total_field].sum()
+            if debit_field is not None:
+                state["nominal"] += group[debit_field].sum()
+            state["sketch"].add_array(group[max_field].to_numpy())
+
+        self.rows += len(page)
+
+    def extend(self, other: "StreamingTps"):
+        for key, other_state in other.groups.items():
+            state = self.groups.get(key)
+            if state is None:
+                self.groups[key] = other_state
+                continue
+
+            state["max"] = np.fmax(state["max"], other_state["max"])
+            for name in ["avg_sum", "avg_count", "total", "nominal"]:
+                state[name] += other_state[name]
+            state["sketch"].merge(other_state["sketch"])
+        self.rows += other.rows
+
+    def to_day_frame(self):
+        """Build the same per-day frame calculate_tps produces, before percent change."""
+        rows = []
+        for key, state in self.groups.items():
+            key = key if isinstance(key, tuple) else (key,)
+            row = dict(zip(self.day_group, key))
+            row["avg_tps"] = (
+                state["avg_sum"] / state["avg_count"]
+                if state["avg_count"]
+                else float("nan")
+            )
+            row["max_percentile_95"] = state["sketch"].quantile(0.95)
+            row["max_tps"] = state["max"]
+            if self.selected_types == "BNI Direct":
+                row["nominal_transaction_per_day"] = state["nominal"]
+            row["total_transaction_per_day"] = state["total"]
+            rows.append(row)
+
+        if not rows:
+            return pd.DataFrame()
+
+        tps_per_day = pd.DataFrame(rows)
+        for column in [
+            "max_tps",
+            "total_transaction_per_day",
+            "nominal_transaction_per_day",
+        ]:
+            if column in tps_per_day:
+                tps_per_day[column] = restore_integer(tps_per_day[column])
+
+        return tps_per_day.sort_values(by=self.day_group).reset_index(drop=True)
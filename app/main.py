@@ -1,8 +1,13 @@
 import streamlit as st
-import calendar
-from core.generate import generate_excel_file, generate_pdf_file
-from datetime import datetime, timedelta, timezone
-from util.enums import Months, Types
+from core.artifacts import clear_artifacts
+from core.cache import clear_cache
+from core.config import client_pool_stats
+from core.store import get_result_store
+from core.jobs import get_scheduler
+from core.generate import generate_batch_file, generate_excel_file, generate_pdf_file
+from datetime import datetime
+from util.enums import Months, Periods, Quarters, Types
+from util.time_range import get_quarter_time_range, get_time_range, get_year_time_range
 
 
 def get_dropdown_options():
@@ -14,36 +19,6 @@ def get_dropdown_options():
     return month_options, type_options, year_options
 
 
-def get_month_range(year, month):
-    days_in_month = calendar.monthrange(year, month)[1]
-    wib_zone = timezone(timedelta(hours=7))
-    return (
-        datetime(year, month, 1, 0, 0, 0, tzinfo=wib_zone).isoformat(),
-        datetime(year, month, days_in_month, 23, 59, 59, tzinfo=wib_zone).isoformat(),
-    )
-
-
-def get_time_range(selected_year: str, selected_month: str):
-    month_number = list(Months).index(selected_month) + 1
-    last_month_year, last_month_number = (
-        (selected_year - 1, 12)
-        if month_number == 1
-        else (selected_year, month_number - 1)
-    )
-
-    start_time, end_time = get_month_range(selected_year, month_number)
-    last_month_start_time, last_month_end_time = get_month_range(
-        last_month_year, last_month_number
-    )
-
-    return {
-        "start_time": start_time,
-        "end_time": end_time,
-        "last_month_start_time": last_month_start_time,
-        "last_month_end_time": last_month_end_time,
-    }
-
-
 def main():
     # Configure the main page
 
@@ -61,22 +36,49 @@ def main():
     )
 
     month_options, type_options, year_options = get_dropdown_options()
-    selected_month = st.selectbox("Select a month", month_options)
+    selected_period = st.selectbox(
+        "Select a period", [period.value for period in Periods]
+    )
+    if selected_period == Periods.MONTH.value:
+        selected_month = st.selectbox("Select a month", month_options)
+    elif selected_period == Periods.QUARTER.value:
+        selected_month = st.selectbox(
+            "Select a quarter", [quarter.value for quarter in Quarters]
+        )
+    else:
+        selected_month = "FY"
     selected_year = st.selectbox("Select a year", year_options)
     selected_type = st.selectbox("Select a type", type_options)
 
-    selected_month_enum = Months(selected_month)
-
-    # Get time range
-    times = get_time_range(selected_year, selected_month_enum)
+    # Get time range, quarters and years are compared with the period before them
+    if selected_period == Periods.MONTH.value:
+        times = get_time_range(selected_year, Months(selected_month))
+    elif selected_period == Periods.QUARTER.value:
+        times = get_quarter_time_range(selected_year, Quarters(selected_month))
+    else:
+        times = get_year_time_range(selected_year)
     selected_detail = {
         "type": selected_type,
         "month": selected_month,
         "year": selected_year,
+        "period": selected_period,
     }
 
     generate_excel_file(times, selected_detail)
     generate_pdf_file(times, selected_detail)
+    generate_batch_file(times, selected_detail)
+
+    if st.sidebar.button("Clear cached data"):
+        clear_cache()
+        clear_artifacts()
+        get_result_store().clear()
+        st.sidebar.success("Cached data cleared")
+
+    with st.sidebar.expander("Report jobs"):
+        st.json(get_scheduler().status())
+
+    with st.sidebar.expander("Elasticsearch connection pool"):
+        st.json(client_pool_stats())
 
 
 if __name__ == "__main__":
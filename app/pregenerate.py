@@ -0,0 +1,96 @@
+"""Pre-generate the reports of the month that just closed for every type.
+
+Meant to run from cron on the first day of the month, from any directory since
+app/connection_config.yaml is found relative to the app. Schedule it after
+cache.closed_grace_minutes past midnight WIB (e.g. 02:00 with the default 60),
+before that the month is not closed yet and nothing is generated:
+
+    python app/pregenerate.py
+    python app/pregenerate.py --year 2024 --month October --format pdf
+"""
+
+import argparse
+import time
+from core.artifacts import store_pregenerated
+from core.cache import is_closed_period
+from core.jobs import get_scheduler
+from core.report import REPORT_FORMATS, build_report, report_file_name
+from util.enums import Months, Types
+from util.time_range import get_closed_month, get_time_range
+
+
+def parse_args():
+    closed_year, closed_month = get_closed_month()
+    parser = argparse.ArgumentParser(
+        description="Pre-generate PDF and Excel reports for every type. Run it "
+        "after cache.closed_grace_minutes past the end of the month, late indexed "
+        "documents are only complete then."
+    )
+    parser.add_argument("--year", type=int, default=closed_year)
+    parser.add_argument(
+        "--month",
+        choices=[month.value for month in Months],
+        default=closed_month.value,
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(REPORT_FORMATS),
+        action="append",
+        help="Report format, repeat for several (default: all)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report_formats = args.format or list(REPORT_FORMATS)
+    times = get_time_range(args.year, Months(args.month))
+
+    # Files are served for good, they must not miss late indexed documents
+    if not is_closed_period(times["end_time"]):
+        print(
+            f"{args.month} {args.year} is not closed yet (ends {times['end_time']} "
+            "plus cache.closed_grace_minutes), nothing generated"
+        )
+        return 1
+
+    jobs = []
+    for report_type in Types:
+        selected_detail = {
+            "type": report_type.value,
+            "month": args.month,
+            "year": args.year,
+        }
+        for report_format in report_formats:
+            job = get_scheduler().submit(
+                (report_type.value, args.month, args.year, report_format, "pregenerate"),
+                "pregenerate",
+                build_report,
+                times,
+                selected_detail,
+                report_format,
+                False,
+            )
+            jobs.append((selected_detail, report_format, job))
+
+    failed = 0
+    for selected_detail, report_format, job in jobs:
+        job.wait()
+        file_name = report_file_name(selected_detail, report_format)
+        if job.error is not None:
+            failed += 1
+            print(f"{file_name}: failed ({job.error})")
+        elif job.result is None:
+            print(f"{file_name}: no data")
+        else:
+            store_pregenerated(file_name, job.result)
+            print(f"{file_name}: stored in {job.finished_at - job.started_at:.1f}s")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    exit_code = main()
+    print(f"Finished in {time.perf_counter() - start:.1f}s")
+    raise SystemExit(exit_code)
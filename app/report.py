@@ -0,0 +1,191 @@
+"""Generate reports from the command line, without Streamlit.
+
+Run it as a module from the repository root, or by path from anywhere (for
+example from cron), the config and queries are found relative to this file:
+
+    python -m app.report --type QRIS --month 2026-09 --format pdf,xlsx --workers 4 --out reports/
+    python /path/to/app/report.py --month 2026-08,2026-09 --out /var/reports/
+
+--type, --month and --format take comma separated lists and default to every
+type, the month that just closed and every format. Progress goes to stderr,
+a JSON summary with the timing of every report goes to stdout, and the exit
+code is non-zero when a report failed.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+# "python -m app.report" only puts the repository root on sys.path
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from core.artifacts import write_atomic
+from core.config import CONFIG_PATH_ENV
+from core.data import prefetch_report_data
+from core.report import REPORT_FORMATS, build_report, report_file_name
+from util.enums import Months, Types
+from util.time_range import get_closed_month, get_time_range
+
+
+def parse_list(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_months(value: str):
+    months = []
+    for item in parse_list(value):
+        try:
+            year, month = (int(part) for part in item.split("-"))
+            months.append((year, list(Months)[month - 1]))
+        except (ValueError, IndexError):
+            raise argparse.ArgumentTypeError(
+                f"Invalid month '{item}', expected YYYY-MM"
+            )
+    return months
+
+
+def parse_choices(choices: list[str]):
+    def parse(value: str):
+        items = parse_list(value)
+        invalid = [item for item in items if item not in choices]
+        if invalid:
+            raise argparse.ArgumentTypeError(
+                f"Invalid choice {invalid}, choose from {choices}"
+            )
+        return items
+
+    return parse
+
+
+def parse_args():
+    closed_year, closed_month = get_closed_month()
+    type_choices = [report_type.value for report_type in Types]
+    parser = argparse.ArgumentParser(
+        description="Generate PDF and Excel reports without Streamlit."
+    )
+    parser.add_argument(
+        "--type",
+        type=parse_choices(type_choices),
+        default=type_choices,
+        help="Report types, comma separated (default: all)",
+    )
+    parser.add_argument(
+        "--month",
+        type=parse_months,
+        default=[(closed_year, closed_month)],
+        help="Months as YYYY-MM, comma separated (default: last closed month)",
+    )
+    parser.add_argument(
+        "--format",
+        type=parse_choices(list(REPORT_FORMATS)),
+        default=list(REPORT_FORMATS),
+        help="Report formats, comma separated (default: all)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Reports generated at the same time",
+    )
+    parser.add_argument("--out", default="reports", help="Output directory")
+    parser.add_argument(
+        "--config",
+        help=f"Config file, overrides {CONFIG_PATH_ENV} and app/connection_config.yaml",
+    )
+    return parser.parse_args()
+
+
+def month_label(year: int, month: Months):
+    return f"{year}-{list(Months).index(month) + 1:02d}"
+
+
+def prefetch_month(year: int, month: Months, types: list[str]):
+    try:
+        prefetch_report_data(get_time_range(year, month), types)
+    except Exception as e:
+        # Every report of the month retries the fetch on its own
+        print(f"Prefetch of {month_label(year, month)} failed: {e}")
+
+
+def run_report(
+    year: int, month: Months, report_type: str, report_format: str, out: str
+):
+    selected_detail = {"type": report_type, "month": month.value, "year": year}
+    file_name = report_file_name(selected_detail, report_format)
+    result = {
+        "type": report_type,
+        "month": month_label(year, month),
+        "format": report_format,
+    }
+
+    start = time.perf_counter()
+    try:
+        buffer = build_report(
+            get_time_range(year, month), selected_detail, report_format
+        )
+        if buffer is None:
+            result["status"] = "empty"
+            print(f"{file_name}: no data")
+        else:
+            path = os.path.join(out, file_name)
+            content = buffer.getvalue()
+            write_atomic(path, content)
+            result.update({"status": "ok", "file": path, "bytes": len(content)})
+            print(f"{file_name}: written")
+    except Exception as e:
+        result.update({"status": "failed", "error": str(e)})
+        print(f"{file_name}: failed ({e})")
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def main():
+    args = parse_args()
+    if args.config:
+        # The config is loaded lazily, so this applies to the whole run
+        os.environ[CONFIG_PATH_ENV] = os.path.abspath(args.config)
+    out = os.path.abspath(args.out)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        # Fetch each month for every type in one pipeline run before rendering
+        list(
+            executor.map(
+                lambda year_month: prefetch_month(*year_month, args.type), args.month
+            )
+        )
+        fetch_seconds = time.perf_counter() - start
+
+        reports = list(
+            executor.map(
+                lambda task: run_report(*task, out),
+                [
+                    (year, month, report_type, report_format)
+                    for year, month in args.month
+                    for report_type in args.type
+                    for report_format in args.format
+                ],
+            )
+        )
+
+    return {
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "fetch_seconds": round(fetch_seconds, 3),
+        "workers": args.workers,
+        "reports": reports,
+    }
+
+
+if __name__ == "__main__":
+    # Keep stdout for the JSON summary, everything else is logged to stderr
+    with redirect_stdout(sys.stderr):
+        summary = main()
+    print(json.dumps(summary))
+    failed = [report for report in summary["reports"] if report["status"] == "failed"]
+    raise SystemExit(1 if failed else 0)
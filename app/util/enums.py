@@ -19,4 +19,17 @@ class Types(Enum):
     BNIDIRECT = "BNI Direct"
     WONDR = "WONDR"
     BIFAST = "BIFAST"
-    QRIS = "QRIS"
\ No newline at end of file
+    QRIS = "QRIS"
+
+
+class Periods(Enum):
+    MONTH = "Month"
+    QUARTER = "Quarter"
+    YEAR = "Year"
+
+
+class Quarters(Enum):
+    Q1 = "Q1"
+    Q2 = "Q2"
+    Q3 = "Q3"
+    Q4 = "Q4"
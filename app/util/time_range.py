@@ -0,0 +1,67 @@
+import calendar
+from datetime import datetime, timedelta, timezone
+from util.enums import Months, Quarters
+
+
+def get_month_range(year, month):
+    days_in_month = calendar.monthrange(year, month)[1]
+    wib_zone = timezone(timedelta(hours=7))
+    return (
+        datetime(year, month, 1, 0, 0, 0, tzinfo=wib_zone).isoformat(),
+        datetime(year, month, days_in_month, 23, 59, 59, tzinfo=wib_zone).isoformat(),
+    )
+
+
+def shift_month(year: int, month: int, offset: int):
+    month_index = year * 12 + month - 1 + offset
+    return month_index // 12, month_index % 12 + 1
+
+
+def get_period_time_range(selected_year: int, first_month: int, months: int):
+    """Range of `months` whole months from first_month, and the same span before it."""
+    last_year, last_month = shift_month(selected_year, first_month, months - 1)
+    previous_first = shift_month(selected_year, first_month, -months)
+    previous_last = shift_month(selected_year, first_month, -1)
+
+    return {
+        "start_time": get_month_range(selected_year, first_month)[0],
+        "end_time": get_month_range(last_year, last_month)[1],
+        # Kept as "last_month" so every consumer reads the previous period the same way
+        "last_month_start_time": get_month_range(*previous_first)[0],
+        "last_month_end_time": get_month_range(*previous_last)[1],
+    }
+
+
+def get_time_range(selected_year: str, selected_month: str):
+    month_number = list(Months).index(selected_month) + 1
+    return get_period_time_range(selected_year, month_number, 1)
+
+
+def get_quarter_time_range(selected_year: int, selected_quarter: Quarters):
+    quarter_number = list(Quarters).index(selected_quarter)
+    return get_period_time_range(selected_year, quarter_number * 3 + 1, 3)
+
+
+def get_year_time_range(selected_year: int):
+    return get_period_time_range(selected_year, 1, 12)
+
+
+def split_month_ranges(start_time: str, end_time: str):
+    """Return the (start, end) of every calendar month the range touches."""
+    start = datetime.fromisoformat(start_time)
+    end = datetime.fromisoformat(end_time)
+
+    month_ranges = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        month_ranges.append(get_month_range(year, month))
+        year, month = shift_month(year, month, 1)
+    return month_ranges
+
+
+def get_closed_month(today: datetime | None = None):
+    """Return (year, Months) of the month that ended most recently in WIB."""
+    today = today or datetime.now(timezone(timedelta(hours=7)))
+    if today.month == 1:
+        return today.year - 1, Months.DECEMBER
+    return today.year, list(Months)[today.month - 2]
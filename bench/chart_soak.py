@@ -0,0 +1,95 @@
+"""Resident memory over repeated chart renders, to show it stays flat.
+
+Renders the Max and Total per day charts of a synthetic month again and again
+in one process, printing RSS every few generations and failing when it grew
+by more than --max-growth-mb after the warm-up:
+
+    python bench/chart_soak.py --generations 500
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+
+# The app modules import each other as top-level packages (core, util)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+# Only the chart and aggregation defaults are read, never a real cluster's config
+os.environ.setdefault(
+    "PORTAL_REPORT_CONFIG", os.path.join(APP_DIR, "template_connection_config.yaml")
+)
+
+import numpy as np
+import pandas as pd
+from core.columnar import add_day_columns
+from core.data import check_type, rename_variable_tps
+from core.presentation import generate_vertical_bar
+
+SELECTED_TYPE = "BNI Direct"
+
+
+def month_data(start: str, rows: int, seed: int):
+    """Formatted day rows of one synthetic month, like get_report_data returns."""
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.integers(0, 30 * 86400, rows))
+    frame = pd.DataFrame(
+        {
+            "@timestamp": pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s"),
+            "max": rng.integers(1, 500, rows),
+            "avg": rng.random(rows) * 100,
+            "total": rng.integers(1, 1000, rows),
+            "total_debit_eq_amt": rng.integers(1, 10**6, rows),
+        }
+    )
+    return rename_variable_tps(add_day_columns(frame), SELECTED_TYPE)["data_pdf_day"]
+
+
+def rss_mb():
+    """Current resident set size, the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--generations", type=int, default=500)
+    parser.add_argument("--every", type=int, default=50, help="Print RSS this often")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--max-growth-mb", type=float, default=20)
+    args = parser.parse_args()
+
+    df_obj = {
+        "this_month": month_data("2024-09-30T17:00:00Z", 50000, 0),
+        "last_month": month_data("2024-08-31T17:00:00Z", 50000, 1),
+    }
+    variable = check_type(SELECTED_TYPE)
+    labels = [f"Max {variable['TPS_RPS']}", f"Total {variable['REQ_TRX']} Per Day"]
+
+    start = time.perf_counter()
+    baseline = None
+    for generation in range(1, args.generations + 1):
+        for label in labels:
+            generate_vertical_bar(df_obj, label, SELECTED_TYPE)
+        if generation == args.warmup:
+            baseline = rss_mb()
+        if generation % args.every == 0 or generation == args.generations:
+            print(
+                f"generation {generation:>5}: RSS {rss_mb():,.1f} MB, "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+
+    if baseline is None:
+        return
+    growth = rss_mb() - baseline
+    print(f"growth after warm-up: {growth:+.1f} MB ({len(labels)} charts per generation)")
+    if growth > args.max_growth_mb:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Peak RSS of building the fetch frame from per-hit dicts vs. ColumnarHits.
+
+Every mode runs in its own process so the peaks do not mix. Pages are made
+one at a time like search responses, so only what the accumulator keeps counts:
+
+    python bench/columnar_memory.py --rows 2000000
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# The app modules import each other as top-level packages (core, util)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+import numpy as np
+import pandas as pd
+from core.columnar import ColumnarHits
+
+FIELDS = ["@timestamp", "max", "avg", "total", "total_debit_eq_amt"]
+PAGE_SIZE = 10000
+
+
+def pages(rows: int):
+    """Yield search pages shaped like the projected BNI Direct hits."""
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 9, 30, 17, tzinfo=timezone.utc)
+    for offset in range(0, rows, PAGE_SIZE):
+        size = min(PAGE_SIZE, rows - offset)
+        seconds = offset + np.arange(size)
+        maxes = rng.integers(1, 500, size).tolist()
+        avgs = (rng.random(size) * 100).tolist()
+        totals = rng.integers(1, 1000, size).tolist()
+        debits = rng.integers(1, 10**6, size).tolist()
+        yield [
+            {
+                "_source": {
+                    "@timestamp": (start + timedelta(seconds=int(second)))
+                    .isoformat()
+                    .replace("+00:00", "Z"),
+                    "max": maxes[i],
+                    "avg": avgs[i],
+                    "total": totals[i],
+                    "total_debit_eq_amt": debits[i],
+                },
+                "sort": [int(second), i],
+            }
+            for i, second in enumerate(seconds.tolist())
+        ]
+
+
+def build_with_dicts(rows: int):
+    # What fetch_data did before: keep every _source dict, then one DataFrame
+    rows_list = []
+    for hits in pages(rows):
+        rows_list.extend(hit["_source"] for hit in hits)
+    df = pd.DataFrame(rows_list)
+    df["@timestamp"] = pd.to_datetime(df["@timestamp"]).dt.tz_convert("UTC")
+    return df
+
+
+def build_with_columnar(rows: int):
+    all_hits = ColumnarHits(FIELDS)
+    for hits in pages(rows):
+        all_hits.add_page(hits)
+    return all_hits.to_dataframe()
+
+
+MODES = {"dicts": build_with_dicts, "columnar": build_with_columnar}
+
+
+def run_mode(mode: str, rows: int):
+    start = time.perf_counter()
+    df = MODES[mode](rows)
+    seconds = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>9}: {len(df):,} rows, peak RSS {peak_mb:,.0f} MB, {seconds:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--mode", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.rows)
+        return
+
+    for mode in MODES:
+        subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--rows", str(args.rows)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
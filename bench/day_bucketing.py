@@ -0,0 +1,75 @@
+"""Time of bucketing rows into WIB days and months, string formatting vs. epoch math.
+
+Both paths start from the UTC timestamps ColumnarHits produces, and their
+output is checked to name the same day and month for every row:
+
+    python bench/day_bucketing.py --rows 5000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta, timezone
+
+# The app modules import each other as top-level packages (core, util)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+import numpy as np
+import pandas as pd
+from core.columnar import add_day_columns
+
+
+def make_frame(rows: int):
+    """One month of UTC timestamps, sorted like the fetched pages."""
+    rng = np.random.default_rng(0)
+    seconds = np.sort(rng.integers(0, 31 * 86400, rows))
+    return pd.DataFrame(
+        {
+            "@timestamp": pd.Timestamp("2024-09-30T17:00:00Z")
+            + pd.to_timedelta(seconds, unit="s"),
+        }
+    )
+
+
+def add_day_strings(df: pd.DataFrame):
+    # What process_and_save_dataframe did before: format every row
+    df["@timestamp"] = pd.to_datetime(df["@timestamp"]).dt.tz_convert("UTC")
+    wib_zone = timezone(timedelta(hours=7))
+    df["TRX_DATE"] = df["@timestamp"].dt.tz_convert(wib_zone).dt.strftime("%Y%m%d")
+    df["per_month"] = df["TRX_DATE"].str[:6].apply(lambda x: f"{x[:4]}-{x[4:]}")
+    return df
+
+
+def timed(bucket, df: pd.DataFrame):
+    start = time.perf_counter()
+    df = bucket(df)
+    return df, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    strings, string_seconds = timed(add_day_strings, df.copy())
+    print(f"  strftime: {len(strings):,} rows in {string_seconds:.2f}s")
+    epochs, epoch_seconds = timed(add_day_columns, df.copy())
+    print(f"     epoch: {len(epochs):,} rows in {epoch_seconds:.2f}s")
+
+    same_day = (
+        pd.to_datetime(strings["TRX_DATE"], format="%Y%m%d") == epochs["TRX_DATE"]
+    ).all()
+    same_month = (strings["per_month"] == epochs["per_month"]).all()
+    print(
+        f"   speedup: {string_seconds / epoch_seconds:.0f}x, "
+        f"same days: {same_day}, same months: {same_month}"
+    )
+    if not (same_day and same_month):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
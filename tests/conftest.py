@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The app modules import each other as top-level packages (core, util)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+# Tests only read the defaults of the template, never a real cluster's config
+os.environ.setdefault(
+    "PORTAL_REPORT_CONFIG", os.path.join(APP_DIR, "template_connection_config.yaml")
+)
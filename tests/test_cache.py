@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+import core.cache as cache
+from core.cache import is_closed_period
+
+# 16:59:59 UTC, the template's grace is 60 minutes
+END_TIME = "2024-10-31T23:59:59+07:00"
+
+
+def utc(hour: int, minute: int, second: int = 0):
+    return datetime(2024, 10, 31, hour, minute, second, tzinfo=timezone.utc)
+
+
+def test_period_is_open_within_the_grace_window():
+    assert not is_closed_period(END_TIME, utc(17, 0))
+    assert not is_closed_period(END_TIME, utc(17, 59, 59))
+
+
+def test_period_is_closed_after_the_grace_window():
+    assert is_closed_period(END_TIME, utc(18, 0))
+
+
+def test_grace_window_is_configurable(monkeypatch):
+    monkeypatch.setattr(
+        cache,
+        "get_config",
+        lambda section, key, default=None: (
+            0 if (section, key) == ("cache", "closed_grace_minutes") else default
+        ),
+    )
+    assert is_closed_period(END_TIME, utc(17, 0))
+
+
+def test_cache_key_changes_with_the_percentile_settings(monkeypatch):
+    settings = {}
+    monkeypatch.setattr(
+        cache,
+        "get_config",
+        lambda section, key, default=None: settings.get(key, default),
+    )
+    args = ("QRIS", "2024-10-01T00:00:00+07:00", END_TIME, {"query": {}})
+    keys = {cache.period_cache_key(*args)}
+    settings["aggregation_backend"] = "pyarrow"
+    keys.add(cache.period_cache_key(*args))
+    settings["sketch_accuracy"] = 0.005
+    keys.add(cache.period_cache_key(*args))
+    assert len(keys) == 3
+
+
+def test_concurrent_writes_leave_one_complete_entry(monkeypatch, tmp_path):
+    import threading
+    import pandas as pd
+
+    monkeypatch.setattr(cache, "cache_dir", lambda: str(tmp_path))
+    cache_key = str(tmp_path / "QRIS" / "2024-10-entry")
+    frames = {
+        name: pd.DataFrame({"value": range(1000)}) for name in cache.CACHE_FRAMES
+    }
+
+    writers = [
+        threading.Thread(target=cache.store_cached_period, args=(cache_key, frames))
+        for _ in range(8)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert cache.load_cached_period(cache_key)["data_pdf_day"].equals(
+        frames["data_pdf_day"]
+    )
+    assert [path.name for path in (tmp_path / "QRIS").iterdir()] == ["2024-10-entry"]
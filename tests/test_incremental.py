@@ -0,0 +1,101 @@
+import copy
+import pandas as pd
+import pytest
+import core.config as config
+import core.data as data
+
+START_TIME = "2024-10-01T00:00:00+07:00"
+END_TIME = "2024-11-01T00:00:00+07:00"
+
+
+class FakeElasticsearch:
+    """Serves the range queries of fetch_hits from a list of documents."""
+
+    def __init__(self):
+        self.docs = []
+
+    def open_point_in_time(self, index, keep_alive):
+        return {"id": "pit"}
+
+    def close_point_in_time(self, id):
+        pass
+
+    def search(self, body, filter_path=None):
+        time_range = body["query"]["bool"]["filter"][0]["range"]["@timestamp"]
+        start, end = pd.Timestamp(time_range["gte"]), pd.Timestamp(time_range["lt"])
+        hits = sorted(
+            (
+                {
+                    "_source": {key: doc[key] for key in body["_source"]["includes"]},
+                    "sort": [pd.Timestamp(doc["@timestamp"]).value, position],
+                }
+                for position, doc in enumerate(self.docs)
+                if start <= pd.Timestamp(doc["@timestamp"]) < end
+            ),
+            key=lambda hit: hit["sort"],
+        )
+        if body.get("search_after"):
+            hits = [hit for hit in hits if hit["sort"] > body["search_after"]]
+        hits = hits[: body["size"]]
+        return {"pit_id": "pit", "hits": {"hits": hits}} if hits else {"pit_id": "pit"}
+
+
+def doc(timestamp: str, value: int):
+    return {"@timestamp": timestamp, "max": value, "avg": value / 2, "total": value}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    elk_config = copy.deepcopy(config.get_elk_config())
+    elk_config["elkhub"]["index-source"] = {"QRIS": "qris*"}
+    elk_config["cache"].update(
+        {"enabled": True, "dir": str(tmp_path), "incremental_overlap_minutes": 10}
+    )
+    elk_config["fetch"].update({"mode": "raw", "slice_hours": 0})
+    monkeypatch.setattr(config, "elk_config", elk_config)
+
+    client = FakeElasticsearch()
+    monkeypatch.setattr(data, "elasticsearch_client", lambda: client)
+    return client
+
+
+def refresh():
+    base_query = config.load_json("app/query/queries.json")["QRIS"]
+    return data.fetch_incremental(base_query, 2, START_TIME, END_TIME, "QRIS")
+
+
+def full_fetch():
+    base_query = config.load_json("app/query/queries.json")["QRIS"]
+    return data.fetch_data(base_query, 2, START_TIME, END_TIME, "QRIS")
+
+
+@pytest.mark.parametrize(
+    "late_timestamp",
+    [
+        # Same day as the cursor, inside the overlap window
+        "2024-10-02T10:55:00+07:00",
+        # Day before the cursor's, already stored as an aggregate
+        "2024-10-01T23:58:00+07:00",
+    ],
+)
+def test_late_document_before_cursor_is_picked_up(client, late_timestamp):
+    client.docs = [
+        doc("2024-10-01T08:00:00+07:00", 5),
+        doc("2024-10-01T23:50:00+07:00", 7),
+        doc("2024-10-02T00:03:00+07:00", 3),
+        doc("2024-10-02T11:00:00+07:00", 4),
+    ]
+    if late_timestamp.startswith("2024-10-01"):
+        # Put the cursor a few minutes after midnight
+        client.docs.pop()
+    refresh()
+
+    client.docs += [doc(late_timestamp, 50), doc("2024-10-02T12:00:00+07:00", 6)]
+    result = refresh()
+
+    expected = full_fetch()["data_pdf_day"]
+    pd.testing.assert_frame_equal(
+        result["data_pdf_day"].reset_index(drop=True),
+        expected.reset_index(drop=True),
+        check_dtype=False,
+    )
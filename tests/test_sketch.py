@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core.columnar import add_day_columns
+from core.data import calculate_tps, report_fields
+from core.sketch import QuantileSketch
+from core.streaming import StreamingTps
+
+RELATIVE_ACCURACY = 0.01
+
+
+def relative_error(estimate: float, exact: float):
+    return abs(estimate - exact) / exact if exact else abs(estimate)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 10, 20, 100, 1000, 20000])
+@pytest.mark.parametrize("distribution", ["tps", "lognormal", "with_zeros"])
+def test_p95_within_relative_accuracy_of_pandas(size, distribution):
+    rng = np.random.default_rng(size)
+    if distribution == "tps":
+        values = rng.integers(1, 500, size).astype(float)
+    elif distribution == "lognormal":
+        values = rng.lognormal(3, 1.5, size)
+    else:
+        values = rng.integers(0, 5, size).astype(float)
+
+    sketch = QuantileSketch(RELATIVE_ACCURACY)
+    sketch.add_array(values)
+
+    exact = pd.Series(values).quantile(0.95)
+    assert relative_error(sketch.quantile(0.95), exact) <= RELATIVE_ACCURACY
+
+
+def test_merged_sketches_match_one_sketch():
+    values = np.random.default_rng(0).integers(1, 500, 10000).astype(float)
+    whole = QuantileSketch(RELATIVE_ACCURACY)
+    whole.add_array(values)
+
+    merged = QuantileSketch(RELATIVE_ACCURACY)
+    for part in np.array_split(values, 7):
+        sketch = QuantileSketch(RELATIVE_ACCURACY)
+        sketch.add_array(part)
+        merged.merge(sketch)
+
+    assert merged.quantile(0.95) == whole.quantile(0.95)
+
+
+def test_empty_sketch_has_no_quantile():
+    assert np.isnan(QuantileSketch(RELATIVE_ACCURACY).quantile(0.95))
+
+
+@pytest.mark.parametrize("selected_types", ["QRIS", "WONDR"])
+def test_streaming_p95_matches_calculate_tps(selected_types):
+    # Low TPS days: few documents per day, where rank interpolation matters most
+    rng = np.random.default_rng(1)
+    size = 3000
+    fields = report_fields(selected_types)
+    seconds = np.sort(rng.integers(0, 30 * 86400, size))
+    frame = pd.DataFrame(
+        {
+            "@timestamp": pd.Timestamp("2024-09-30T17:00:00Z")
+            + pd.to_timedelta(seconds, unit="s"),
+            fields[1]: rng.integers(1, 40, size),
+            fields[2]: rng.random(size) * 20,
+            fields[3]: rng.integers(1, 1000, size),
+        }
+    )
+    if selected_types == "WONDR":
+        frame["type"] = np.where(rng.random(size) < 0.5, "external", "internal")
+
+    hits = [
+        {"_source": {**source, "@timestamp": source["@timestamp"].isoformat()}}
+        for source in frame.to_dict("records")
+    ]
+    streaming = StreamingTps(fields, selected_types)
+    for start in range(0, len(hits), 250):
+        streaming.add_page(hits[start : start + 250])
+
+    exact = calculate_tps(add_day_columns(frame), selected_types)["day"]
+    estimate = streaming.to_day_frame()
+
+    assert len(estimate) == len(exact)
+    errors = [
+        relative_error(estimated, expected)
+        for estimated, expected in zip(
+            estimate["max_percentile_95"], exact["max_percentile_95"]
+        )
+    ]
+    assert max(errors) <= RELATIVE_ACCURACY